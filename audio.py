@@ -0,0 +1,149 @@
+# audio.py
+"""Where the beeps go.
+
+voice.py renders notes and hands them to an audio backend:
+
+* `pygame`: plays through the sound card (the default). pygame is only
+  imported when this backend starts.
+* `null`: plays nothing and takes no time. Handy on servers, in containers
+  and for simulations.
+* `record`: plays nothing but captures every note into one PCM buffer, and
+  writes it to a .wav file at exit if given a path (`record:out.wav`).
+
+Pick one with the LITTLEBEEPERS_AUDIO environment variable or main.py's
+--audio flag.
+"""
+import atexit
+import os
+import wave
+
+import metrics
+import synth
+
+AUDIO_ENV = "LITTLEBEEPERS_AUDIO"
+DEFAULT_BACKEND = "pygame"
+
+
+class NullBackend:
+    """Plays nothing, instantly."""
+
+    name = "null"
+    realtime = False  # Non-realtime backends get notes on a virtual clock, with no waiting
+
+    def start(self):
+        pass
+
+    def make_sound(self, pcm):
+        return pcm
+
+    def play(self, sound, at):
+        """Plays `sound` at `at` seconds on the session clock; returns a handle for stop()."""
+        return None
+
+    def stop(self, handle):
+        pass
+
+    def close(self):
+        pass
+
+
+class RecordingBackend(NullBackend):
+    """Captures every note, placed at its time on the session clock."""
+
+    name = "record"
+
+    def __init__(self, path=None):
+        self.path = path
+        self.pcm = bytearray()
+
+    def play(self, sound, at):
+        start = int(at * synth.SAMPLE_RATE) * synth.SAMPLE_WIDTH
+        end = start + len(sound)
+        if len(self.pcm) < end:
+            self.pcm.extend(bytes(end - len(self.pcm)))
+        self.pcm[start:end] = sound
+        return None
+
+    def close(self):
+        if not self.path:
+            return
+        with wave.open(self.path, "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(synth.SAMPLE_WIDTH)
+            wav_file.setframerate(synth.SAMPLE_RATE)
+            wav_file.writeframes(bytes(self.pcm))
+
+
+class PygameBackend:
+    """Real-time playback through pygame's mixer."""
+
+    name = "pygame"
+    realtime = True
+
+    def __init__(self):
+        self.pygame = None
+        self.rate = synth.SAMPLE_RATE
+
+    @metrics.timed("audio.mixer_init")
+    def start(self):
+        if self.pygame is None:
+            import pygame
+            self.pygame = pygame
+        if not self.pygame.mixer.get_init():
+            self.pygame.mixer.init(frequency=synth.SAMPLE_RATE, size=-16, channels=1)
+        # The device may not run at the rate asked for (or the mixer was already up)
+        self.rate = self.pygame.mixer.get_init()[0]
+
+    def make_sound(self, pcm):
+        return self.pygame.mixer.Sound(buffer=synth.resample(pcm, synth.SAMPLE_RATE, self.rate))
+
+    def play(self, sound, at):
+        return sound.play()
+
+    def stop(self, channel):
+        if channel is not None:
+            channel.stop()
+
+    def close(self):
+        if self.pygame is not None:
+            self.pygame.mixer.quit()
+
+
+def make_backend(spec):
+    """Builds a backend from a name like "null" or "record:out.wav"."""
+    name, _, arg = spec.partition(":")
+    name = name.strip().lower()
+    if name == "pygame":
+        return PygameBackend()
+    if name in ("null", "none", "off"):
+        return NullBackend()
+    if name == "record":
+        return RecordingBackend(arg or None)
+    raise ValueError(f"Unknown audio backend '{spec}' (try pygame, null or record[:file.wav]).")
+
+
+_backend = None
+
+
+def set_backend(backend):
+    """Switches the process-wide backend (a backend object or a name)."""
+    global _backend
+    if isinstance(backend, str):
+        backend = make_backend(backend)
+    if _backend is not None:
+        _backend.close()
+    _backend = backend
+    return backend
+
+
+def get_backend():
+    """The process-wide backend, chosen from LITTLEBEEPERS_AUDIO on first use."""
+    if _backend is None:
+        set_backend(os.environ.get(AUDIO_ENV) or DEFAULT_BACKEND)
+    return _backend
+
+
+@atexit.register
+def _close_backend():
+    if _backend is not None:
+        _backend.close()
@@ -0,0 +1,78 @@
+# benchmarks/bench_startup.py
+"""Cold-start import time for each entry point, checked against a budget.
+
+Run from the project root:
+
+    python benchmarks/bench_startup.py [--repeat 5] [--scale 1.0]
+
+Each entry point is imported in a fresh interpreter under `python -X importtime`
+(bytecode cached in a scratch directory, so compiling isn't counted) and the
+best of several runs is compared with its budget. Audio (NumPy, pygame) must
+not be imported until the first word is spoken. Exits with status 1 if any
+entry point is over budget or pulls in a module it shouldn't.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Milliseconds of cumulative import time allowed per entry point
+BUDGETS = {
+    "main": 60,
+    "play": 60,
+    "pet_dashboard": 55,
+    "voice_sampler": 55,
+    "pet_utils": 50,
+    "simulate": 50,
+}
+HEAVY = ("numpy", "pygame", "multiprocessing")  # Loaded on demand, never at startup
+
+
+def import_time(module, pycache):
+    """(milliseconds, names of every module imported) for one fresh import of `module`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-X", f"pycache_prefix={pycache}",
+         "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": ""},
+    )
+    total = None
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # The column header
+        imported.add(name.strip())
+        if name.strip() == module and not name[1:].startswith(" "):
+            total = int(cumulative) / 1000
+    return total, imported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check entry-point import times against their budgets.")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per entry point, best counts (default 5)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget, for slow machines")
+    args = parser.parse_args(argv)
+
+    failed = False
+    with tempfile.TemporaryDirectory() as pycache:
+        for module, budget in BUDGETS.items():
+            import_time(module, pycache)  # Warm the bytecode cache
+            runs = [import_time(module, pycache) for _ in range(args.repeat)]
+            best = min(ms for ms, _ in runs)
+            heavy = sorted(name for name in runs[0][1] if name.split(".")[0] in HEAVY)
+            limit = budget * args.scale
+            ok = best <= limit and not heavy
+            failed |= not ok
+            print(f"{module:<14} {best:7.1f} ms  budget {limit:5.0f} ms  {'ok' if ok else 'OVER'}"
+                  + (f"  imports {', '.join(heavy)}" if heavy else ""))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+# benchmarks/bench_suite.py
+"""Throughput and peak memory of the hot paths, on synthetic collections.
+
+Run from the project root:
+
+    python benchmarks/bench_suite.py [--scales 10,100,1000] [-o results.json]
+    python benchmarks/bench_suite.py --scales 10000,100000 --history 20 --words 10
+    python benchmarks/bench_suite.py --baseline old.json
+
+Everything runs headlessly (null audio) in a scratch directory, so data/ is
+never touched. For each scale a collection of pets with long histories and
+large vocabularies is generated from --seed, then these are timed:
+
+    synth           rendering words (synth.render_word) and beeps
+                    (voice_sampler.generate_wave_data); samples/s
+    save            saving the whole new collection (pet_utils.save_pets)
+    load            reading it back with cold caches (pet_utils.read_pets)
+    update          rewriting single pets (pet_utils.update_pet)
+    playdate_pool   pooling letters and drawing new words, in memory
+    playdate        conclude_playdate, committed to disk
+    summary_scan    recomputing summaries from full histories
+    report          pet_stats.all_summaries plus one Markdown report per pet
+
+The results are JSON: seconds, operations per second and tracemalloc's
+peak bytes for every case. With --baseline, each case also gets its speed
+relative to an earlier run, and cases more than --tolerance slower are
+listed on stderr (exit status 1).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ["LITTLEBEEPERS_AUDIO"] = "null"
+
+import learning
+import pet_dashboard
+import pet_stats
+import pet_utils
+import synth
+import voice_sampler
+from play import conclude_playdate
+
+SCALES = (10, 100, 1000)
+HISTORY = 100  # History entries per pet
+WORDS = 50     # Words per pet
+SAMPLE_OPS = 500  # Cap on in-memory operations (pooling, scans, reports) per scale
+UPDATES = 50      # Single-pet saves per scale
+PLAYDATES = 20    # Committed playdates per scale
+SYNTH_WORDS = 200
+
+
+def measure(case, scale, ops, func, track_memory=True):
+    """Runs func() once and returns its result line; `ops` is what it did, e.g. pets saved."""
+    if track_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    peak = None
+    if track_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {
+        "case": case,
+        "pets": scale,
+        "ops": ops,
+        "seconds": round(seconds, 6),
+        "per_second": round(ops / seconds, 2) if seconds else None,
+        "peak_bytes": peak,
+    }
+
+
+def make_collection(size, history, words, rng):
+    """`size` pets, each with `words` words and `history` visits and playdates."""
+    names = [f"pet{i:06d}" for i in range(size)]
+    start = datetime(2024, 1, 1)
+    pets = []
+    for name in names:
+        vocab = ["".join(rng.choices(learning.ALPHABET, k=learning.WORD_LENGTH)) for _ in range(words)]
+        when = start + timedelta(seconds=rng.randrange(86400))
+        events = []
+        for _ in range(history):
+            when += timedelta(minutes=rng.randrange(1, 600))
+            entry = {"timestamp": when.isoformat(), "duration_seconds": rng.randrange(1, 900)}
+            partner = rng.choice(names)
+            if partner != name and rng.random() < 0.5:
+                entry["event"] = "playdate"
+                entry["partners"] = [partner]
+            events.append(entry)
+        pets.append({
+            "name": name,
+            "species": "Little Beeper",
+            "spawn_date": start.isoformat(),
+            "released": rng.random() < 0.1,
+            "history": events,
+            "words": vocab,
+        })
+    return pets
+
+
+def forget_store():
+    """Drops everything pet_utils keeps in memory, so the next read is cold."""
+    pet_utils._index_cache = pet_utils._IndexView()
+    pet_utils._on_disk.clear()
+    pet_utils._known_ids.clear()
+    pet_utils._session = None
+
+
+def bench_synth(rng, track_memory):
+    words = ["".join(rng.choices(learning.ALPHABET, k=learning.WORD_LENGTH)) for _ in range(SYNTH_WORDS)]
+    per_word = (synth.num_samples(voice_sampler.NOTE_DURATION)
+                + synth.num_samples(voice_sampler.GAP_DURATION)) * learning.WORD_LENGTH
+
+    def render_words():
+        for word in words:
+            synth.render_word(word, voice_sampler.NOTE_DURATION, voice_sampler.GAP_DURATION,
+                              voice_sampler.AMPLITUDE)
+
+    def render_beeps():
+        for word in words:
+            for char in word:
+                voice_sampler.generate_wave_data(synth.char_freq(char), voice_sampler.NOTE_DURATION)
+
+    per_beep = synth.num_samples(voice_sampler.NOTE_DURATION)
+    return [
+        {**measure("synth_words", 0, per_word * len(words), render_words, track_memory), "unit": "samples"},
+        {**measure("synth_beeps", 0, per_beep * len(words) * learning.WORD_LENGTH, render_beeps,
+                   track_memory), "unit": "samples"},
+    ]
+
+
+def bench_scale(size, args, rng):
+    results = []
+    pets = make_collection(size, args.history, args.words, rng)
+    memory = not args.no_memory
+
+    forget_store()
+    results.append(measure("save", size, size, lambda: pet_utils.save_pets(pets), memory))
+
+    forget_store()
+    loaded = []
+    results.append(measure("load", size, size, lambda: loaded.extend(pet_utils.read_pets()), memory))
+
+    sample = rng.sample(loaded, min(size, SAMPLE_OPS))
+    updated = sample[:UPDATES]
+
+    def update():
+        for pet in updated:
+            pet_utils.record_event(pet, {"timestamp": datetime.now().isoformat(), "duration_seconds": 5})
+            pet_utils.update_pet(pet)
+    results.append(measure("update", size, len(updated), update, memory))
+
+    active = [pet for pet in loaded if not pet.get("released")]
+    groups = [rng.sample(active, rng.randint(2, min(5, len(active))))
+              for _ in range(SAMPLE_OPS if len(active) >= 2 else 0)]
+
+    def pool():
+        for group in groups:
+            counts = learning.pool_counts(group)
+            learning.draw_words(list(counts), list(counts.values()), len(group), rng)
+    results.append(measure("playdate_pool", size, len(groups), pool, memory))
+
+    committed = groups[:PLAYDATES]
+
+    def playdates():
+        for group in committed:
+            conclude_playdate(group, 60)
+    results.append(measure("playdate", size, len(committed), playdates, memory))
+
+    def scan():
+        for pet in sample:
+            pet_utils.build_summary(pet)
+    results.append(measure("summary_scan", size, len(sample), scan, memory))
+
+    def report():
+        summaries = {s["id"]: s for s in pet_stats.all_summaries()}
+        for pet in sample:
+            pet_dashboard.generate_pet_report(pet, summaries[pet["id"]])
+    results.append(measure("report", size, len(sample), report, memory))
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Adds speed relative to `baseline` to each result; returns the cases that got slower."""
+    before = {(r["case"], r["pets"]): r for r in baseline.get("results", [])}
+    slower = []
+    for result in results:
+        old = before.get((result["case"], result["pets"]))
+        if not old or not old.get("per_second") or not result["per_second"]:
+            continue
+        result["vs_baseline"] = round(result["per_second"] / old["per_second"], 3)
+        if result["vs_baseline"] < 1 - tolerance:
+            slower.append(result)
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark synthesis, the pet store, playdates and reports.")
+    parser.add_argument("--scales", default=",".join(map(str, SCALES)),
+                        help="collection sizes, comma separated (default %(default)s)")
+    parser.add_argument("--history", type=int, default=HISTORY, help=f"history entries per pet (default {HISTORY})")
+    parser.add_argument("--words", type=int, default=WORDS, help=f"words per pet (default {WORDS})")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the synthetic data (default 0)")
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc (faster, timings only)")
+    parser.add_argument("-o", "--output", help="write the JSON here instead of stdout")
+    parser.add_argument("--baseline", help="earlier results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="slowdown vs --baseline that counts as a regression (default 0.2)")
+    args = parser.parse_args(argv)
+    scales = [int(s) for s in args.scales.split(",") if s.strip()]
+
+    rng = random.Random(args.seed)
+    results = bench_synth(rng, not args.no_memory)
+    home = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        try:
+            for size in scales:
+                workdir = os.path.join(scratch, str(size))
+                os.makedirs(workdir)
+                os.chdir(workdir)  # pet_utils and the dashboard use paths relative to here
+                results += bench_scale(size, args, rng)
+                print(f"{size} pets done", file=sys.stderr)
+        finally:
+            os.chdir(home)
+
+    report = {
+        "python": platform.python_version(),
+        "numpy": synth.HAVE_NUMPY,
+        "seed": args.seed,
+        "history": args.history,
+        "words": args.words,
+        "memory_tracked": not args.no_memory,
+        "results": results,
+    }
+    slower = []
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            slower = compare(results, json.load(f), args.tolerance)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    for result in slower:
+        print(f"slower: {result['case']} at {result['pets']} pets "
+              f"(x{result['vs_baseline']} of baseline)", file=sys.stderr)
+    return 1 if slower else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+# benchmarks/bench_synth.py
+"""Samples-per-second for tone synthesis, before and after synth.py.
+
+Run from the project root:
+
+    python benchmarks/bench_synth.py
+
+"before" is the per-sample loop voice_sampler.py used to run; "after" is
+synth.py with whichever backend is available (NumPy and/or array). The
+last lines compare a 20-pet chorus rendered in one batch against rendering
+the same words one after another.
+"""
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import synth
+
+NOTE = 0.18
+GAP = 0.07
+AMPLITUDE = 16000
+WORD = "asdfg"
+REPEATS = 20
+CHORUS = ["asdfg", "kjhgf", "hhjkk", "dsafg", "gfdsa"] * 4  # 20 pets
+
+
+def loop_tone(frequency, duration):
+    """The original per-sample loop, kept here as the baseline."""
+    num_samples = int(duration * synth.SAMPLE_RATE)
+    data = bytearray()
+    for i in range(num_samples):
+        angle = 2 * math.pi * i * frequency / synth.SAMPLE_RATE
+        sample = int(AMPLITUDE * math.sin(angle))
+        data += sample.to_bytes(2, byteorder="little", signed=True)
+    return data
+
+
+def loop_word(word):
+    gap = loop_tone(0, GAP)
+    data = bytearray()
+    for char in word:
+        data += loop_tone(synth.char_freq(char), NOTE)
+        data += gap
+    return bytes(data)
+
+
+def word_with(kernel):
+    def render(word):
+        freqs = [synth.char_freq(c) for c in word]
+        return kernel(freqs, synth.num_samples(NOTE), synth.num_samples(GAP),
+                      AMPLITUDE, 0.0, synth.SAMPLE_RATE)
+    return render
+
+
+def measure(render):
+    samples = 0
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        samples += len(render(WORD)) // synth.SAMPLE_WIDTH
+    return samples / (time.perf_counter() - start)
+
+
+def main():
+    candidates = [("before: per-sample loop", loop_word),
+                  ("after: synth (array)", word_with(synth._word_array))]
+    if synth.HAVE_NUMPY:
+        candidates.append(("after: synth (numpy)", word_with(synth._word_numpy)))
+
+    reference = loop_word(WORD)
+    baseline = None
+    for label, render in candidates:
+        identical = render(WORD) == reference
+        rate = measure(render)
+        baseline = baseline or rate
+        print(f"{label:<26} {rate:>14,.0f} samples/s  x{rate / baseline:6.1f}"
+              f"  {'identical' if identical else 'DIFFERS'}")
+
+    def one_by_one():
+        for word in CHORUS:
+            synth.render_word(word, NOTE, GAP, AMPLITUDE)
+
+    def chorus():
+        synth.render_chorus(CHORUS, NOTE, GAP, AMPLITUDE)
+
+    for label, render in [("20 words, one by one", one_by_one), ("20-pet chorus, batched", chorus)]:
+        render()  # Warm up (NumPy is imported on first use)
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            render()
+        print(f"{label:<26} {(time.perf_counter() - start) / REPEATS * 1000:>11.2f} ms per render")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# benchmarks/check_recovery.py
+"""Crash recovery for committed playdates.
+
+Run from the project root:
+
+    python benchmarks/check_recovery.py
+
+In a scratch directory (data/ is never touched), three pets are created and
+a child process concludes a playdate between them, killing itself with
+os._exit() right after the Nth pet file is written, for every N. The pet
+files are then checked to really be half-updated with the journal still in
+place, and a plain read_pets() must finish the playdate: every pet has its
+new word and playdate entry, the index agrees, and the journal is gone.
+Exits with status 1 if any crash point isn't recovered.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, ROOT)
+os.environ["LITTLEBEEPERS_AUDIO"] = "null"
+
+import pet_utils
+
+NAMES = ("Bip", "Bop", "Bap")
+CRASHED = 17  # Exit status of a child that crashed where it was told to
+
+# Concludes a playdate between every pet, dying after the Nth pet file write.
+CHILD = """
+import os, sys
+sys.path.insert(0, {root!r})
+import pet_utils
+from play import conclude_playdate
+
+crash_after = {crash_after}
+real_write_pet = pet_utils._write_pet
+
+def write_pet_then_crash(pet):
+    written = real_write_pet(pet)
+    global crash_after
+    crash_after -= written
+    if written and not crash_after:
+        os._exit({crashed})
+    return written
+
+pet_utils._write_pet = write_pet_then_crash
+conclude_playdate(pet_utils.session().pets(), 60)
+"""
+
+
+def raw_pet(pet_id):
+    with open(pet_utils.pet_path(pet_id), "r") as f:
+        return json.load(f)
+
+
+def check(crash_after):
+    """Problems found after crashing after `crash_after` pet writes; empty if recovered."""
+    problems = []
+    pet_utils._index_cache = pet_utils._IndexView()  # Nothing carried over from the last scratch store
+    pet_utils._on_disk.clear()
+    pet_utils._known_ids.clear()
+    for name in NAMES:
+        pet_utils.add_pet({"name": name, "species": "Little Beeper",
+                           "spawn_date": "2024-01-01T00:00:00", "word": "asdfg", "history": []})
+    ids = [entry["id"] for entry in pet_utils.pet_entries()]
+
+    child = subprocess.run([sys.executable, "-c", CHILD.format(root=ROOT, crash_after=crash_after,
+                                                               crashed=CRASHED)])
+    if child.returncode != CRASHED:
+        return [f"the child exited with {child.returncode}, not at the crash point"]
+    updated = sum(1 for pet_id in ids if raw_pet(pet_id)["history"])
+    if updated != crash_after:
+        problems.append(f"{updated} pet file(s) were updated before the crash, expected {crash_after}")
+    if not os.path.exists(pet_utils.JOURNAL_FILE):
+        problems.append("the journal was gone after the crash")
+
+    pets = pet_utils.read_pets()
+    summaries = {entry["id"]: entry["summary"] for entry in pet_utils.pet_entries()}
+    for pet in pets:
+        if [entry.get("event") for entry in pet["history"]] != ["playdate"]:
+            problems.append(f"{pet['name']} has no single playdate entry after recovery")
+        if len(pet.get("words", [])) != 2:
+            problems.append(f"{pet['name']} didn't keep its new word after recovery")
+        if summaries[pet["id"]] != pet["summary"]:
+            problems.append(f"{pet['name']}'s index summary doesn't match its file")
+    if os.path.exists(pet_utils.JOURNAL_FILE):
+        problems.append("the journal is still there after recovery")
+    return problems
+
+
+def main():
+    failed = False
+    home = os.getcwd()
+    for crash_after in range(1, len(NAMES) + 1):
+        with tempfile.TemporaryDirectory() as scratch:
+            os.chdir(scratch)
+            try:
+                problems = check(crash_after)
+            finally:
+                os.chdir(home)
+        failed |= bool(problems)
+        print(f"crash after pet {crash_after}: {'ok' if not problems else 'FAILED'}")
+        for problem in problems:
+            print(f"  {problem}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+# file_lock.py
+"""Advisory file locks shared between processes.
+
+The pet store (data/pets/.lock) and the word cache (data/audio_cache/.lock)
+both serialize their writers with locked(): flock() where it exists, and
+msvcrt's byte-range lock on Windows.
+"""
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def locked(path):
+    """Holds an exclusive advisory lock on `path` (created if missing) for the block."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a+") as f:
+        _acquire(f)
+        try:
+            yield
+        finally:
+            _release(f)
+
+
+def _acquire(f):
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        return
+    f.seek(0)
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:  # LK_LOCK gives up after ~10 seconds; keep waiting
+            pass
+
+
+def _release(f):
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,65 @@
+# learning.py
+"""How Little Beepers learn words.
+
+These are the rules play.py uses at every playdate, kept free of audio and
+prompts so simulate.py can run them thousands of times.
+
+Each pet keeps a small letter histogram (`letter_counts`) that grows as it
+learns words, so a playdate's letter pool is just the sum of a few 8-entry
+histograms rather than a list of every letter every participant knows.
+"""
+import random
+from collections import Counter
+from itertools import accumulate
+
+ALPHABET = "asdfghjk"  # One letter per note in synth.CHAR_TO_FREQ
+WORD_LENGTH = 5
+
+
+def secret_word(rng=random):
+    """The word a pet knows when it is created."""
+    return "".join(rng.choice(ALPHABET) for _ in range(WORD_LENGTH))
+
+
+def known_words(pet):
+    """Every word a pet knows, including a secret word not yet moved to `words`."""
+    if "words" in pet:
+        return pet["words"]
+    if "word" in pet:
+        return [pet["word"]]
+    return []
+
+
+def letter_counts(pet):
+    """The pet's letter histogram, built from its words the first time it's needed."""
+    if "letter_counts" not in pet:
+        counts = Counter()
+        for word in known_words(pet):
+            counts.update(word)
+        pet["letter_counts"] = dict(counts)
+    return pet["letter_counts"]
+
+
+def count_word(pet, word):
+    """Adds a newly learned word to the pet's letter histogram."""
+    counts = letter_counts(pet)
+    for letter in word:
+        counts[letter] = counts.get(letter, 0) + 1
+
+
+def pool_counts(pets):
+    """How often each letter appears across every word the playdate's pets know."""
+    pool = Counter()
+    for pet in pets:
+        pool.update(letter_counts(pet))
+    return pool
+
+
+def draw_words(letters, counts, count, rng=random):
+    """
+    Draws `count` new words in one batch. Each letter is picked with
+    probability proportional to its count, which is the same as picking
+    uniformly from a list holding every letter the group knows.
+    """
+    picks = rng.choices(letters, cum_weights=list(accumulate(counts)), k=count * WORD_LENGTH)
+    return [picks[i:i + WORD_LENGTH] for i in range(0, len(picks), WORD_LENGTH)]
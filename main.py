@@ -1,19 +1,31 @@
+import argparse
+import json
 import random
+import sys
 import time
-import json
 from datetime import datetime
+from itertools import islice
+
+import audio
+import metrics
+from play import conclude_playdate, host_playdate
 from voice import speak_word
-from pet_utils import load_pets, save_pets
+from pet_utils import HIDING_MESSAGE, new_pet_id, record_event, session, to_json
+from learning import secret_word
 
 
-def create_pet():
-    name = input("Enter a name for your new pet: ").strip() or "Unnamed Pet"
+def create_pet(name="Unnamed Pet", tx=None):
+    """
+    Creates a pet, with its spawn-time secret word, and adds it to the
+    collection. With `tx` the pet is staged there and saved when it commits.
+    """
     species = "Little Beeper"
 
     # Generate the spawn-time secret word
-    word = "".join(random.choice("asdfghjk") for _ in range(5))
+    word = secret_word()
 
     new_pet = {
+        "id": new_pet_id(),
         "name": name,
         "species": species,
         "spawn_date": datetime.now().isoformat(),
@@ -28,23 +40,48 @@ def create_pet():
         }
     }
 
-    pets = load_pets()
-    pets.append(new_pet)
-    save_pets(pets)
+    if tx is None:
+        session().add(new_pet)
+    else:
+        tx.add(new_pet)
+    return new_pet
 
-    print(f"\n✨ {name} the {species} has joined your collection!")
-    print(f"They already know a secret word: {word}")
-    speak_word(word) # The secret word is played once upon creation.
 
+def create_pet_option():
+    name = input("Enter a name for your new pet: ").strip() or "Unnamed Pet"
+    pet = create_pet(name)
 
-def log_visit(pet, duration_seconds):
-    pet.setdefault("history", [])
-    pet["history"].append({
+    print(f"\n✨ {name} the {pet['species']} has joined your collection!")
+    print(f"They already know a secret word: {pet['word']}")
+    speak_word(pet["word"]) # The secret word is played once upon creation.
+
+
+def log_visit(pet, duration_seconds, tx=None):
+    if tx is not None:
+        tx.log_event(pet, duration_seconds=duration_seconds)
+        return
+    record_event(pet, {
         "timestamp": datetime.now().isoformat(),
         "duration_seconds": duration_seconds
     })
 
 
+def pick_word(pet):
+    """A random word the pet knows (its secret word, if that's all it has)."""
+    # Support multiple words if present
+    if "words" in pet:
+        return random.choice(pet["words"])
+    return pet.get("word", "[silent]")
+
+
+def release_pet(pet, tx=None):
+    if tx is not None:
+        tx.stage(pet)["released"] = True
+        return
+    pet['released'] = True
+    session().update(pet)
+
+
 def visit_pet(pet):
     print(f"\n--- Visiting {pet['name']} the {pet['species']} ---")
     start_time = time.time()
@@ -58,23 +95,16 @@ def visit_pet(pet):
 
         choice = input("Choose an option: ").strip()
         if choice == "1":
-            print(json.dumps(pet, indent=2))
+            print(to_json(pet, indent=2))
         elif choice == "2":
-            # Support multiple words if present
-            if "words" in pet:
-                word = random.choice(pet["words"])
-            else:
-                word = pet.get("word", "[silent]")
-
+            word = pick_word(pet)
             print(f"\n{pet['name']} speaks a word it knows: {word}") # Text changed for clarity.
             speak_word(word)
         elif choice == "3":
             print(f"\nReleasing a pet is permanent. They will be free to explore the world on their own.")
             confirm = input(f"Are you sure you want to release {pet['name']}? (type 'yes' to confirm): ").strip().lower()
             if confirm == 'yes':
-                pet['released'] = True
-                from pet_utils import update_pet
-                update_pet(pet)
+                release_pet(pet)
                 print(f"\n{pet['name']} beeps thankfully for the wonderful time you spent together.")
                 print("It is thrilled to go explore on its own. Goodbye, friend! 👋")
                 time.sleep(2) # Pause to let the message sink in.
@@ -91,14 +121,14 @@ def visit_pet(pet):
     log_visit(pet, duration_seconds)
 
     # Update the pet safely
-    from pet_utils import update_pet
-    update_pet(pet)
+    session().update(pet)
 
     print(f"\n✅ Interaction of {duration_seconds} seconds recorded.\n")
 
 def select_pet():
-    pets = load_pets()
+    pets = session().pets()
     if not pets:
+        print(HIDING_MESSAGE)
         return None
 
     print("\nWhich pet would you like to visit?")
@@ -118,13 +148,192 @@ def select_pet():
         return None
 
 
-def host_playdate_option():
-    # Local import to avoid circular import
-    from play import host_playdate
-    host_playdate()
+class Batch:
+    """
+    Runs scripted commands (dicts, or JSON text) against the session's pets.
+
+    Changes are staged in one transaction that commits every `checkpoint`
+    commands (0: once, at the end), so a whole script costs one load of the
+    store and one locked write per checkpoint. A command that fails is
+    reported and skipped without touching anything. One result is yielded
+    per command, once the changes it describes have been saved.
+    """
+
+    def __init__(self, checkpoint=0):
+        self.checkpoint = checkpoint
+        self.by_id = {}
+        self.by_name = {}
+
+    def know(self, pet):
+        self.by_id[pet["id"]] = pet
+        self.by_name.setdefault(pet["name"], []).append(pet)
+
+    def find(self, ref, tx):
+        """The active pet with id or name `ref`."""
+        if not isinstance(ref, str):
+            raise ValueError(f"Pets are given by name or id, not {ref!r}.")
+        pet = self.by_id.get(ref)
+        if pet is None:
+            named = self.by_name.get(ref, [])
+            if not named:
+                raise ValueError(f"There's no pet called {ref!r}.")
+            if len(named) > 1:
+                raise ValueError(f"{len(named)} pets are called {ref!r}; use an id instead.")
+            pet = named[0]
+        if tx.current(pet).get("released"):
+            raise ValueError(f"{pet['name']} has been released.")
+        return pet
+
+    def run(self, commands):
+        for pet in session().pets():
+            self.know(pet)
+        commands = iter(commands)
+        while True:
+            chunk = list(islice(commands, self.checkpoint or None))
+            if not chunk:
+                return
+            with session().transaction() as tx:
+                results = [self.run_one(command, tx) for command in chunk]
+            yield from results
+
+    def run_one(self, command, tx):
+        op = None
+        try:
+            if isinstance(command, str):
+                command = json.loads(command)
+            if not isinstance(command, dict):
+                raise ValueError("A command must be a JSON object.")
+            op = command.get("op")
+            if not isinstance(op, str) or op not in COMMANDS:
+                raise ValueError(f"Unknown op {op!r} (try {', '.join(COMMANDS)}).")
+            return {"op": op, "ok": True, **COMMANDS[op](self, tx, command)}
+        except ValueError as e:
+            return {"op": op, "ok": False, "error": str(e)}
+
+
+def _seconds(command):
+    seconds = command.get("seconds", 0)
+    if not isinstance(seconds, int) or isinstance(seconds, bool) or seconds < 0:
+        raise ValueError("'seconds' must be a whole number of seconds.")
+    return seconds
+
+
+def _pet_ref(command):
+    if "pet" not in command:
+        raise ValueError("Which pet? Give its name or id as 'pet'.")
+    return command["pet"]
+
+
+def _create(batch, tx, command):
+    pet = create_pet(str(command.get("name") or "Unnamed Pet"), tx)
+    batch.know(pet)
+    return {"id": pet["id"], "name": pet["name"], "word": pet["word"]}
+
+
+def _visit(batch, tx, command):
+    pet = batch.find(_pet_ref(command), tx)
+    seconds = _seconds(command)
+    log_visit(pet, seconds, tx)
+    return {"id": pet["id"], "name": pet["name"], "seconds": seconds}
+
+
+def _speak(batch, tx, command):
+    pet = batch.find(_pet_ref(command), tx)
+    word = pick_word(tx.current(pet))
+    speak_word(word)
+    return {"id": pet["id"], "name": pet["name"], "word": word}
+
+
+def _release(batch, tx, command):
+    pet = batch.find(_pet_ref(command), tx)
+    release_pet(pet, tx)
+    return {"id": pet["id"], "name": pet["name"]}
+
+
+def _playdate(batch, tx, command):
+    refs = command.get("pets")
+    if not isinstance(refs, list):
+        raise ValueError("'pets' must be a list of names or ids.")
+    pets = [batch.find(ref, tx) for ref in refs]
+    if len({pet["id"] for pet in pets}) != len(pets):
+        raise ValueError("A pet can only join a playdate once.")
+    if len(pets) < 2:
+        raise ValueError("A playdate needs at least 2 active pets.")
+    seconds = _seconds(command)
+    learned = conclude_playdate(pets, seconds, tx)
+    return {"seconds": seconds,
+            "learned": [{"id": pet["id"], "name": pet["name"], "word": word} for pet, word in learned]}
+
+
+COMMANDS = {
+    "create": _create,
+    "visit": _visit,
+    "speak": _speak,
+    "release": _release,
+    "playdate": _playdate,
+}
+
+
+def _commands_from_args(args):
+    """The batch commands one subcommand stands for."""
+    if args.command == "create":
+        return [{"op": "create", "name": name} for name in args.names]
+    if args.command == "playdate":
+        return [{"op": "playdate", "pets": args.pets, "seconds": args.seconds}]
+    if args.command == "visit":
+        return [{"op": "visit", "pet": args.pet, "seconds": args.seconds}]
+    return [{"op": args.command, "pet": args.pet}]
+
+
+def run_commands(commands, checkpoint=0, out=sys.stdout):
+    """Runs commands as a Batch, writing one JSON result per line. Returns 1 if any failed."""
+    status = 0
+    for result in Batch(checkpoint).run(commands):
+        out.write(json.dumps(result) + "\n")
+        out.flush()
+        status |= not result["ok"]
+    return status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Little Beepers: create, visit and listen to your pets. "
+                    "With no command, opens the interactive menu.")
+    parser.add_argument("--audio", help="audio backend: pygame (default), null, or record[:file.wav]")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    create = commands.add_parser("create", help="create pets")
+    create.add_argument("names", nargs="+", metavar="NAME")
+    visit = commands.add_parser("visit", help="log a visit with a pet")
+    visit.add_argument("pet", help="name or id")
+    visit.add_argument("--seconds", type=int, default=0, help="length of the visit (default 0)")
+    speak = commands.add_parser("speak", help="have a pet say one of its words")
+    speak.add_argument("pet", help="name or id")
+    release = commands.add_parser("release", help="release a pet (permanent)")
+    release.add_argument("pet", help="name or id")
+    playdate = commands.add_parser("playdate", help="hold a playdate; everyone learns a word")
+    playdate.add_argument("pets", nargs="+", metavar="PET", help="names or ids")
+    playdate.add_argument("--seconds", type=int, default=0, help="length of the playdate (default 0)")
+    batch = commands.add_parser("batch", help="run JSON Lines commands, e.g. "
+                                '{"op": "create", "name": "Bip"}, from a file or stdin')
+    batch.add_argument("file", nargs="?", default="-", help="command file (default: stdin)")
+    batch.add_argument("--checkpoint", type=int, default=0, metavar="N",
+                       help="commit every N commands (default: once, at the end)")
+
+    args = parser.parse_args(argv)
+    if args.audio:
+        audio.set_backend(args.audio)
 
+    if args.command == "batch":
+        if args.checkpoint < 0:
+            parser.error("--checkpoint can't be negative")
+        source = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+        with source:
+            lines = (line for line in source if line.strip() and not line.lstrip().startswith("#"))
+            return run_commands(lines, args.checkpoint)
+    if args.command:
+        return run_commands(_commands_from_args(args))
 
-def main():
     print("\n👾 Welcome to Little Beepers!")
     print("Discover and care for your own unique sound-making companions. What will they have to say?")
     print("Find out more at https://github.com/bertjerred/littlebeepers\n")
@@ -138,13 +347,13 @@ def main():
 
         choice = input("What would you like to do? ").strip()
         if choice == "1":
-            create_pet()
+            create_pet_option()
         elif choice == "2":
             pet = select_pet()
             if pet:
                 visit_pet(pet)
         elif choice == "3":
-            host_playdate_option()
+            host_playdate()
         elif choice == "4":
             print("\nGoodbye! Your pets will be happily entertaining themselves while you are away.\n")
             break
@@ -153,4 +362,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(metrics.profiled(main)())
\ No newline at end of file
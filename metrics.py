@@ -0,0 +1,182 @@
+# metrics.py
+"""Opt-in timers and counters for the hot paths.
+
+Off unless LITTLEBEEPERS_METRICS is set:
+
+    LITTLEBEEPERS_METRICS=1 python main.py            summary on stderr at exit
+    LITTLEBEEPERS_METRICS=run.json python main.py     summary written as JSON
+
+When it is off, @timed hands back the function it decorates untouched and
+timer() is a shared do-nothing context, so instrumented code runs as
+before. Each timer keeps a call count, total/min/max and a histogram of
+durations in power-of-two microsecond buckets. Only the process that
+started the program writes a summary, not its worker processes.
+
+LITTLEBEEPERS_PROFILE=out.prof runs an entry point wrapped in profiled()
+under cProfile and saves the stats there (`-` prints the top functions on
+stderr instead).
+"""
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+METRICS_ENV = "LITTLEBEEPERS_METRICS"
+PROFILE_ENV = "LITTLEBEEPERS_PROFILE"
+OWNER_ENV = "LITTLEBEEPERS_METRICS_PID"  # Set by the process that writes the summary
+
+_target = os.environ.get(METRICS_ENV, "")
+ENABLED = _target not in ("", "0")
+
+_timers = {}    # name -> Timer
+_counters = {}  # name -> total
+_lock = threading.Lock()
+_started = time.perf_counter()
+
+
+class Timer:
+    """Every duration recorded under one name."""
+
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+        self.buckets = {}  # k -> calls that took under 2**k microseconds
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        k = int(seconds * 1e6).bit_length()
+        self.buckets[k] = self.buckets.get(k, 0) + 1
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total_s": round(self.total, 6),
+            "mean_ms": round(self.total / self.count * 1000, 3),
+            "min_ms": round(self.min * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "histogram": {_bucket_label(k): n for k, n in sorted(self.buckets.items())},
+        }
+
+
+def _bucket_label(k):
+    """'<1us', '<512us', '<2ms', ... for the bucket holding durations under 2**k microseconds."""
+    us = 1 << k
+    return f"<{us}us" if us < 1000 else f"<{us // 1000}ms" if us < 1_000_000 else f"<{us // 1_000_000}s"
+
+
+def record(name, seconds):
+    with _lock:
+        timer = _timers.get(name)
+        if timer is None:
+            timer = _timers[name] = Timer()
+        timer.add(seconds)
+
+
+def timed(name):
+    """Decorator: records how long every call takes, under `name`."""
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def _span(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+_OFF = nullcontext()
+
+
+def timer(name):
+    """`with timer(name):` records how long the block takes."""
+    return _span(name) if ENABLED else _OFF
+
+
+def count(name, n=1):
+    """Adds `n` to the counter `name`."""
+    if ENABLED:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + n
+
+
+def summary():
+    """Everything recorded so far, as plain data."""
+    with _lock:
+        return {
+            "elapsed_s": round(time.perf_counter() - _started, 3),
+            "timers": {name: timer.to_dict() for name, timer in sorted(_timers.items())},
+            "counters": dict(sorted(_counters.items())),
+        }
+
+
+def format_summary(data):
+    lines = [f"metrics: {data['elapsed_s']} s"]
+    if data["timers"]:
+        lines.append(f"  {'timer':<26}{'calls':>8}{'total s':>11}{'mean ms':>10}{'max ms':>10}")
+    for name, t in data["timers"].items():
+        lines.append(f"  {name:<26}{t['count']:>8}{t['total_s']:>11.3f}{t['mean_ms']:>10.3f}{t['max_ms']:>10.3f}")
+        lines.append("      " + "  ".join(f"{label}:{n}" for label, n in t["histogram"].items()))
+    for name, n in data["counters"].items():
+        lines.append(f"  {name:<26}{n:>8}")
+    return "\n".join(lines)
+
+
+def write_summary(target=None):
+    """Writes the summary to stderr, or as JSON to the path `target`."""
+    target = target or _target
+    data = summary()
+    if target in ("1", "stderr", "-"):
+        print(format_summary(data), file=sys.stderr)
+    else:
+        with open(target, "w") as f:
+            json.dump(data, f, indent=2)
+
+
+def profiled(main):
+    """Wraps an entry point so it runs under cProfile when LITTLEBEEPERS_PROFILE is set."""
+    path = os.environ.get(PROFILE_ENV)
+    if not path:
+        return main
+
+    @functools.wraps(main)
+    def wrapper(*args, **kwargs):
+        import cProfile
+        import pstats
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(main, *args, **kwargs)
+        finally:
+            if path == "-":
+                pstats.Stats(profile, stream=sys.stderr).sort_stats("cumulative").print_stats(25)
+            else:
+                profile.dump_stats(path)
+    return wrapper
+
+
+if ENABLED and os.environ.setdefault(OWNER_ENV, str(os.getpid())) == str(os.getpid()):
+    atexit.register(write_summary)
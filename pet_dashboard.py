@@ -1,17 +1,23 @@
 # pet_dashboard.py
+import argparse
+import csv
 import json
 import os
 from datetime import datetime, timedelta
 
-DATA_FILE = "data/pets.json"
+import metrics
+import pet_stats
+import pet_utils
+
 REPORT_DIR = "reports"
+REPORT_INDEX = os.path.join(REPORT_DIR, ".report_index.json")  # What each saved report was made from
+REPORT_FORMATS = ("md", "json", "csv")
+CSV_FIELDS = ["id", "name", "species", "status", "spawn_date", "age_seconds", "last_interaction",
+              "total_seconds", "playdates", "partners", "word_count", "words"]
 
 def load_pets():
-    """Loads all pets from the JSON file."""
-    if not os.path.exists(DATA_FILE):
-        return []
-    with open(DATA_FILE, "r") as f:
-        return json.load(f)
+    """Loads all pets from the pet store."""
+    return pet_utils.read_pets()
 
 def format_timedelta(delta: timedelta) -> str:
     """Formats a timedelta object into a human-readable string."""
@@ -31,28 +37,30 @@ def format_timedelta(delta: timedelta) -> str:
         
     return " ".join(parts) if parts else "0s"
 
-def display_summary(pets):
-    """Prints a high-level summary of the entire pet collection."""
+def display_summary(summaries):
+    """Prints a high-level summary of the entire pet collection (from pet_stats summaries)."""
     print("--- 🐾 Pet Collection Dashboard 🐾 ---")
-    if not pets:
+    if not summaries:
         print("No pets found. Create one in the main app first!")
         return
 
-    total_pets = len(pets)
-    active_pets = sum(1 for p in pets if not p.get("released"))
-    released_pets = total_pets - active_pets
-    
-    total_time_spent = sum(h.get("duration_seconds", 0) for p in pets for h in p.get("history", []))
-    total_time_delta = timedelta(seconds=total_time_spent)
+    totals = pet_stats.summarize_collection(summaries)
+    total_time_delta = timedelta(seconds=totals["total_seconds"])
 
-    print(f"Total Pets:      {total_pets} ({active_pets} active, {released_pets} released)")
+    print(f"Total Pets:      {totals['pets']} ({totals['active']} active, {totals['released']} released)")
     print(f"Total Time Spent:  {format_timedelta(total_time_delta)}")
     print("-" * 38 + "\n")
 
-def generate_pet_report(pet: dict) -> str:
-    """Generates a detailed, multi-line string report for a single pet."""
+@metrics.timed("report.markdown")
+def generate_pet_report(pet: dict, stats: dict = None) -> str:
+    """Generates a detailed, multi-line string report for a single pet.
+
+    `stats` is the pet's pet_stats summary; it is computed here if not given.
+    """
     report_lines = []
     now = datetime.now()
+    if stats is None:
+        stats = pet_stats.summarize_pet(pet)
 
     # --- Basic Info & Status ---
     spawn_date = datetime.fromisoformat(pet["spawn_date"])
@@ -64,14 +72,13 @@ def generate_pet_report(pet: dict) -> str:
     report_lines.append(f"**Age:** {format_timedelta(age)}")
 
     # --- Interaction Stats ---
-    history = pet.get("history", [])
     last_interaction_str = "Never"
-    if history:
-        last_timestamp = datetime.fromisoformat(history[-1]["timestamp"])
+    if stats["last_interaction"]:
+        last_timestamp = datetime.fromisoformat(stats["last_interaction"])
         time_since = now - last_timestamp
         last_interaction_str = f"{format_timedelta(time_since)} ago"
     
-    total_seconds = sum(h.get("duration_seconds", 0) for h in history)
+    total_seconds = stats["total_seconds"]
     
     report_lines.append(f"**Last Interaction:** {last_interaction_str}")
     report_lines.append(f"**Total Time Spent:** {format_timedelta(timedelta(seconds=total_seconds))}")
@@ -82,38 +89,185 @@ def generate_pet_report(pet: dict) -> str:
     report_lines.append(f"Words: `{'`, `'.join(words)}`")
 
     # --- Playdate Analysis ---
-    playdates = [h for h in history if h.get("event") == "playdate"]
-    partners = {partner for pd in playdates for partner in pd.get("partners", [])}
+    partners = stats["partners"]
     report_lines.append(f"\n## Social History")
-    report_lines.append(f"**Playdates Attended:** {len(playdates)}")
+    report_lines.append(f"**Playdates Attended:** {stats['playdates']}")
     if partners:
-        report_lines.append(f"**Has played with:** {', '.join(sorted(list(partners)))}")
+        report_lines.append(f"**Has played with:** {', '.join(partners)}")
     else:
         report_lines.append("**Has played with:** No one yet")
     
     return "\n".join(report_lines)
 
+@metrics.timed("report.data")
+def report_data(pet: dict, stats: dict = None) -> dict:
+    """The same report as generate_pet_report, as plain data for JSON and CSV."""
+    if stats is None:
+        stats = pet_stats.summarize_pet(pet)
+    age = datetime.now() - datetime.fromisoformat(pet["spawn_date"])
+    return {
+        "id": pet.get("id"),
+        "name": pet["name"],
+        "species": pet["species"],
+        "status": "released" if pet.get("released") else "active",
+        "spawn_date": pet["spawn_date"],
+        "age_seconds": int(age.total_seconds()),
+        "last_interaction": stats["last_interaction"],
+        "total_seconds": stats["total_seconds"],
+        "playdates": stats["playdates"],
+        "partners": stats["partners"],
+        "word_count": stats["word_count"],
+        "words": list(pet.get("words", [pet.get("word")])),
+    }
+
+def report_path(pet_name: str, extension: str = "md", pet_id: str = None) -> str:
+    stem = pet_name.replace(' ', '_') + (f"_{pet_id}" if pet_id else "")
+    filename = f"{stem}_status_{datetime.now().strftime('%Y%m%d')}.{extension}"
+    return os.path.join(REPORT_DIR, filename)
+
 def save_report(pet_name: str, content: str):
     """Saves the generated report content to a Markdown file."""
     os.makedirs(REPORT_DIR, exist_ok=True)
-    filename = f"{pet_name.replace(' ', '_')}_status_{datetime.now().strftime('%Y%m%d')}.md"
-    filepath = os.path.join(REPORT_DIR, filename)
+    filepath = report_path(pet_name)
     with open(filepath, "w") as f:
         f.write(content)
     print(f"\n✅ Report saved successfully to: {filepath}")
 
-def main():
+# --- Bulk Reports ---
+def _render_reports(job):
+    """Worker: reads one pet and renders its Markdown report and report data."""
+    pet_id, stats = job
+    pet = pet_utils.read_pet(pet_id)
+    if pet is None:
+        return None
+    return generate_pet_report(pet, stats), report_data(pet, stats)
+
+def load_report_index():
+    if not os.path.exists(REPORT_INDEX):
+        return {}
+    with open(REPORT_INDEX, "r") as f:
+        return json.load(f)
+
+def save_report_index(index):
+    with open(REPORT_INDEX, "w") as f:
+        json.dump(index, f, indent=2)
+
+@metrics.timed("report.export")
+def export_reports(summaries, formats=("md",), jobs=None, force=False):
+    """Renders reports for many pets in a process pool and writes them out together.
+
+    Markdown and JSON reports are written one file per pet; CSV is a single
+    table for the whole batch. A pet is skipped when its file hasn't changed
+    since its last saved report and those files are still there.
+    """
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    index = load_report_index()
+    per_pet = [fmt for fmt in formats if fmt != "csv"]
+
+    changed = set()
+    for stats in summaries:
+        sig = list(pet_utils.pet_signature(stats["id"]) or [])
+        previous = index.get(stats["id"], {})
+        files = {fmt: path for fmt, path in previous.get("files", {}).items() if fmt in per_pet}
+        if (force or previous.get("sig") != sig or len(files) < len(per_pet)
+                or not all(os.path.exists(path) for path in files.values())):
+            changed.add(stats["id"])
+
+    # The CSV table covers every selected pet, so it needs them all rendered.
+    todo = summaries if "csv" in formats else [s for s in summaries if s["id"] in changed]
+    skipped = len(summaries) - len(changed)
+    from concurrent.futures import ProcessPoolExecutor  # Only bulk exports pay for multiprocessing
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        jobs_in = [(stats["id"], stats) for stats in todo]
+        rendered = list(pool.map(_render_reports, jobs_in, chunksize=max(1, len(jobs_in) // 64)))
+
+    rows = []
+    written = 0
+    for stats, result in zip(todo, rendered):
+        if result is None:
+            continue
+        markdown, data = result
+        rows.append(data)
+        if stats["id"] not in changed:
+            continue
+        entry = index.setdefault(stats["id"], {})
+        files = entry.setdefault("files", {})
+        if "md" in per_pet:
+            files["md"] = report_path(stats["name"], "md", stats["id"])
+            with open(files["md"], "w") as f:
+                f.write(markdown)
+        if "json" in per_pet:
+            files["json"] = report_path(stats["name"], "json", stats["id"])
+            with open(files["json"], "w") as f:
+                json.dump(data, f, indent=2)
+        written += len(per_pet)
+        entry["sig"] = list(pet_utils.pet_signature(stats["id"]) or [])
+
+    if "csv" in formats and rows:
+        csv_path = os.path.join(REPORT_DIR, f"collection_status_{datetime.now().strftime('%Y%m%d')}.csv")
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow({**row, "partners": "; ".join(row["partners"]),
+                                 "words": " ".join(row["words"])})
+        written += 1
+
+    save_report_index(index)
+    print(f"✅ Wrote {written} report file(s) for {len(summaries)} pet(s); {skipped} unchanged pet(s) skipped.")
+
+def print_history(summaries):
+    """Streams full histories, archived entries included, as JSON lines."""
+    for stats in summaries:
+        pet = pet_utils.read_pet(stats["id"])
+        if pet is None:
+            continue
+        for entry in pet_utils.iter_history(pet):
+            print(json.dumps({"pet": pet["name"], **entry}))
+
+def main(argv=None):
     """Main function to run the dashboard."""
-    all_pets = load_pets()
-    display_summary(all_pets)
+    parser = argparse.ArgumentParser(description="Summaries and status reports for your pet collection.")
+    batch = parser.add_argument_group("bulk reports (no prompts)")
+    batch.add_argument("--all", action="store_true", help="write reports for every pet")
+    batch.add_argument("--active", action="store_true", help="only pets that haven't been released")
+    batch.add_argument("--name", help="only pets whose name contains this text")
+    batch.add_argument("--format", default="md",
+                       help="comma-separated formats: md, json, csv (default: md)")
+    batch.add_argument("--jobs", type=int, help="worker processes (default: one per core)")
+    batch.add_argument("--force", action="store_true", help="rewrite reports even if nothing changed")
+    parser.add_argument("--history", metavar="NAME",
+                        help="print the full history (archived entries too) of pets whose name contains NAME")
+    args = parser.parse_args(argv)
+
+    if args.history:
+        print_history(pet_utils.filter_pets(pet_stats.all_summaries(), name=args.history))
+        return
+
+    if args.all or args.active or args.name:
+        formats = [fmt.strip().lower() for fmt in args.format.split(",") if fmt.strip()]
+        unknown = set(formats) - set(REPORT_FORMATS)
+        if unknown or not formats:
+            parser.error(f"--format must be a mix of {', '.join(REPORT_FORMATS)}")
+        summaries = pet_utils.filter_pets(pet_stats.all_summaries(),
+                                          active_only=args.active, name=args.name)
+        if not summaries:
+            print("No matching pets found.")
+            return
+        export_reports(summaries, formats, jobs=args.jobs, force=args.force)
+        return
+
+    # Summaries come straight from the store's index; no history is read.
+    all_stats = pet_stats.all_summaries()
+    display_summary(all_stats)
 
-    if not all_pets:
+    if not all_stats:
         return
 
     while True:
         print("Select a pet for a detailed report:")
-        for i, pet in enumerate(all_pets, 1):
-            print(f"  {i}. {pet['name']}")
+        for i, stats in enumerate(all_stats, 1):
+            print(f"  {i}. {stats['name']}")
         print("  Q. Quit")
 
         choice = input("Your choice: ").strip().lower()
@@ -121,11 +275,15 @@ def main():
         if choice == 'q':
             break
         
-        if choice.isdigit() and 1 <= int(choice) <= len(all_pets):
-            selected_pet = all_pets[int(choice) - 1]
+        if choice.isdigit() and 1 <= int(choice) <= len(all_stats):
+            selected_pet = pet_utils.read_pet(all_stats[int(choice) - 1]["id"])
+            if selected_pet is None:
+                print("That pet seems to have wandered off. Please pick another.")
+                continue
+            stats = pet_stats.summarize_pet(selected_pet)
             
             print("\n" + "="*50)
-            report_content = generate_pet_report(selected_pet)
+            report_content = generate_pet_report(selected_pet, stats)
             print(report_content)
             print("="*50 + "\n")
             
@@ -137,4 +295,4 @@ def main():
             print("Invalid choice, please try again.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    metrics.profiled(main)()
\ No newline at end of file
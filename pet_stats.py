@@ -0,0 +1,64 @@
+# pet_stats.py
+"""Collection statistics for the dashboard.
+
+The pet store keeps a running summary for every pet (total time, playdates,
+partners, first and last interaction, word count) and mirrors it into its
+index (data/pets/index.json plus the lines appended to index.log since).
+Everything here reads those summaries, so listing the collection or
+totalling it never opens a pet file or walks a history. The index itself is
+cached in memory by pet_utils, which reads only what was appended to the
+log since it last looked.
+"""
+import metrics
+import pet_utils
+
+
+def summarize_pet(pet):
+    """Everything the dashboard needs about one pet, from its stored summary."""
+    return {
+        "id": pet.get("id"),
+        "name": pet["name"],
+        "species": pet["species"],
+        "spawn_date": pet["spawn_date"],
+        "released": bool(pet.get("released")),
+        **pet_utils.pet_summary(pet),
+    }
+
+
+def _from_entry(entry):
+    return {
+        "id": entry["id"],
+        "name": entry["name"],
+        "species": entry["species"],
+        "spawn_date": entry["spawn_date"],
+        "released": entry["released"],
+        **entry["summary"],
+    }
+
+
+@metrics.timed("report.summaries")
+def all_summaries():
+    """Summaries for the whole collection, in collection order, from the index alone.
+
+    Index lines written before summaries existed are filled in once, by
+    rebuilding just those pets.
+    """
+    entries = pet_utils.pet_entries()
+    missing = [entry["id"] for entry in entries if "summary" not in entry]
+    if missing:
+        pet_utils.rebuild(missing)
+        entries = pet_utils.pet_entries()
+    return [_from_entry(entry) for entry in entries if "summary" in entry]
+
+
+def summarize_collection(summaries):
+    """Collection-wide totals from per-pet summaries."""
+    active = sum(1 for s in summaries if not s["released"])
+    return {
+        "pets": len(summaries),
+        "active": active,
+        "released": len(summaries) - active,
+        "total_seconds": sum(s["total_seconds"] for s in summaries),
+        "playdates": sum(s["playdates"] for s in summaries),
+        "words": sum(s["word_count"] for s in summaries),
+    }
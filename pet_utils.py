@@ -1,38 +1,905 @@
 # pet_utils.py
+"""Loading and saving pets.
+
+Every pet lives in its own file, data/pets/<id>.json, and data/pets/index.json
+lists the ids in collection order together with each pet's name, spawn date,
+status and summary. Updating one pet rewrites only that pet's file; if its
+index line changed, the new line is appended to data/pets/index.log, which
+is folded back into index.json once it has as many lines as the index has
+pets. An event therefore writes one pet and one short line, never the whole
+index.
+
+The summary (`pet["summary"]`) holds running totals: time spent, playdates,
+partners, first and last interaction, and word count. record_event() keeps it
+up to date as history is added, so listings and the dashboard read the index
+and never walk a history. `python pet_utils.py rebuild` recomputes every
+summary from the raw history. An older single-file data/pets.json is migrated
+into this layout the first time the store is used.
+
+History older than a chosen horizon can be moved out of the pet's file into
+append-only JSON Lines segments under data/archive/<id>/ (optionally gzipped)
+with `python pet_utils.py compact --days 90`. The summary keeps counting
+archived entries, and iter_history() streams them back on demand.
+
+Files are replaced atomically (temp file, fsync, rename), so readers never see
+a half-written pet. Writers take an advisory lock on data/pets/.lock for the
+few milliseconds they spend writing, and re-read the index under it, so two
+programs saving at once don't drop each other's pets. If a pet's file changed
+since this program read it, the history and words added here are re-applied
+to the newer copy before it is written, rather than overwriting it.
+
+Changes to several pets that belong together (a playdate) go through a
+Transaction: they are staged on copies and committed in one locked write,
+recorded first in data/pets/.journal.json so a crash halfway through is
+finished on the next start instead of leaving some pets updated and some not.
+
+Interactive programs use one PetRepository per session (see session()): it
+loads the collection once, hands out the same pet dicts every time, writes
+changes straight through, and reloads only pets whose files changed on disk.
+"""
+import argparse
+import gzip
+import hashlib
 import json
 import os
+import threading
+import uuid
+from contextlib import contextmanager
+from copy import deepcopy
+from datetime import datetime, timedelta
+
+import file_lock
+import metrics
+from learning import count_word, known_words, letter_counts
+from vocabulary import Vocabulary
 
 DATA_DIR = "data"
-PETS_FILE = os.path.join(DATA_DIR, "pets.json")
+PETS_FILE = os.path.join(DATA_DIR, "pets.json")  # Legacy single-file collection
+PETS_DIR = os.path.join(DATA_DIR, "pets")
+INDEX_FILE = os.path.join(PETS_DIR, "index.json")
+LOCK_FILE = os.path.join(PETS_DIR, ".lock")
+INDEX_LOG = os.path.join(PETS_DIR, "index.log")
+JOURNAL_FILE = os.path.join(PETS_DIR, ".journal.json")
+ARCHIVE_DIR = os.path.join(DATA_DIR, "archive")
+HIDING_MESSAGE = "Hmm... I think all the pets are hiding right now."
+HISTORY_HORIZON_DAYS = 90  # Default for `compact`: keep this much history in the pet's file
+_BASE = "_base"  # Key in loaded pet dicts: (digest, signature, len(history), len(known_words)); never saved
+INDEX_LOG_MIN = 64  # index.log lines always allowed before it's folded into index.json
 
 
-def load_pets():
-    if not os.path.exists(PETS_FILE):
-        print("Hmm... I think all the pets are hiding right now.")
+class _IndexView:
+    """index.json as last parsed, with the index.log lines since applied on top."""
+
+    def __init__(self, sig=None, digest=None, entries=()):
+        self.sig = sig  # Of the index.json this was parsed from
+        self.digest = digest
+        self.entries = list(entries)
+        self.positions = {entry["id"]: i for i, entry in enumerate(self.entries)}
+        self.log_offset = 0  # Bytes of index.log applied; 0 until its header matches
+        self.log_lines = 0
+
+    def apply(self, entry):
+        i = self.positions.get(entry["id"])
+        if i is None:
+            self.positions[entry["id"]] = len(self.entries)
+            self.entries.append(entry)
+        else:
+            self.entries[i] = entry
+
+
+# In-memory view of the store: the parsed index and, for each pet file as last
+# read or written, a digest of its contents, so unchanged pets are never
+# rewritten. (What each loaded dict was based on lives in the dict itself,
+# under _BASE; see _reconcile().)
+_index_cache = _IndexView()
+_on_disk = {}  # id -> digest
+_known_ids = set()  # Ids handed out by read_pets or saved by this process
+
+_lock = threading.RLock()
+_lock_depth = 0
+
+
+def new_pet_id():
+    return uuid.uuid4().hex[:12]
+
+
+def pet_path(pet_id):
+    return os.path.join(PETS_DIR, f"{pet_id}.json")
+
+
+def _signature(path):
+    return _stat_signature(os.stat(path))
+
+
+def _stat_signature(st):
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _digest(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+@contextmanager
+def store_lock():
+    """
+    Holds the store's advisory write lock. Re-entrant within a process, so
+    helpers that lock can call each other.
+    """
+    global _lock_depth
+    with _lock:
+        if _lock_depth:
+            _lock_depth += 1
+            try:
+                yield
+            finally:
+                _lock_depth -= 1
+            return
+
+        with file_lock.locked(LOCK_FILE):
+            _lock_depth = 1
+            try:
+                yield
+            finally:
+                _lock_depth = 0
+
+
+@metrics.timed("store.write_file")
+def _atomic_write(path, text):
+    """Replaces `path` with `text` so readers see either the old or new file."""
+    directory = os.path.dirname(path)
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_directory(directory)
+
+
+def _fsync_directory(directory):
+    """Makes renames and removals in `directory` durable (not possible on Windows)."""
+    if os.name != "nt":
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def _encode(value):
+    if isinstance(value, Vocabulary):
+        return value.to_list()
+    raise TypeError(f"{type(value).__name__} can't be saved as JSON")
+
+
+def _stored(item):
+    """A pet as it's saved: without the _BASE bookkeeping of a loaded dict."""
+    if isinstance(item, dict) and _BASE in item:
+        return {key: value for key, value in item.items() if key != _BASE}
+    return item
+
+
+@metrics.timed("store.serialize")
+def to_json(data, **kwargs):
+    """
+    json.dumps that understands Vocabulary (saved as a plain list of words)
+    and leaves out _BASE, for a pet or a list of pets.
+    """
+    data = [_stored(item) for item in data] if isinstance(data, list) else _stored(data)
+    return json.dumps(data, default=_encode, **kwargs)
+
+
+@metrics.timed("store.parse")
+def _from_json(text):
+    pet = json.loads(text)
+    if isinstance(pet.get("words"), list):
+        pet["words"] = Vocabulary(pet["words"])
+    return pet
+
+
+def _index_entry(pet):
+    return {
+        "id": pet["id"],
+        "name": pet["name"],
+        "species": pet.get("species"),
+        "spawn_date": pet["spawn_date"],
+        "released": bool(pet.get("released")),
+        "summary": deepcopy(pet_summary(pet)),  # Not the live dict, which keeps changing
+    }
+
+
+def _add_to_summary(summary, entry):
+    summary["total_seconds"] += entry.get("duration_seconds", 0)
+    if entry.get("event") == "playdate":
+        summary["playdates"] += 1
+        summary["partners"] = sorted(set(summary["partners"]) | set(entry.get("partners", [])))
+    if summary["first_interaction"] is None:
+        summary["first_interaction"] = entry["timestamp"]
+    summary["last_interaction"] = entry["timestamp"]
+
+
+def build_summary(pet):
+    """Computes a pet's summary from scratch, in one pass over its history."""
+    summary = {
+        "total_seconds": 0,
+        "playdates": 0,
+        "partners": [],
+        "first_interaction": None,
+        "last_interaction": None,
+        "word_count": len(known_words(pet)),
+    }
+    for entry in iter_history(pet):
+        _add_to_summary(summary, entry)
+    return summary
+
+
+def pet_summary(pet):
+    """The pet's running summary, built from its history the first time it's needed."""
+    if "summary" not in pet:
+        pet["summary"] = build_summary(pet)
+    return pet["summary"]
+
+
+def record_event(pet, entry):
+    """Appends a history entry and folds it into the pet's summary."""
+    summary = pet_summary(pet)
+    pet.setdefault("history", []).append(entry)
+    _add_to_summary(summary, entry)
+
+
+def add_word(pet, word):
+    """Adds `word` to the pet's vocabulary, moving a lone secret word into `words`."""
+    letter_counts(pet)  # Built from the old words first, if it's missing
+    summary = pet_summary(pet)
+    words = pet.get("words")
+    if not isinstance(words, Vocabulary):
+        words = pet["words"] = Vocabulary(words or [])
+    secret = pet.pop("word", None)
+    if secret is not None and secret not in words:
+        words.append(secret)
+    if words.append(word):
+        count_word(pet, word)
+    summary["word_count"] = len(words)
+
+
+def _read_index():
+    """The index entries, re-read only as far as index.json or index.log changed."""
+    migrate_legacy_file()
+    if os.path.exists(JOURNAL_FILE):
+        _replay_journal()
+    return _load_index()
+
+
+def _load_index():
+    """_read_index() without first finishing an interrupted transaction."""
+    global _index_cache
+    try:
+        sig = _signature(INDEX_FILE)
+    except FileNotFoundError:
+        _index_cache = _IndexView()
         return []
-    with open(PETS_FILE, "r") as f:
-        pets = json.load(f)
-        if not pets:
-            print("Hmm... I think all the pets are hiding right now.")
-        return pets
+    if _index_cache.sig != sig:
+        with open(INDEX_FILE, "r") as f:
+            with metrics.timer("store.parse_index"):
+                sig = _stat_signature(os.fstat(f.fileno()))
+                text = f.read()
+                _index_cache = _IndexView(sig, _digest(text), json.loads(text))
+    _read_index_log(_index_cache)
+    return _index_cache.entries
+
+
+def _read_index_log(view):
+    """Applies the index.log lines written since `view` last looked."""
+    try:
+        if os.path.getsize(INDEX_LOG) <= view.log_offset:
+            return
+    except FileNotFoundError:
+        return
+    with open(INDEX_LOG, "rb") as f:
+        if not view.log_offset:
+            header = f.readline()
+            if not header.endswith(b"\n") or json.loads(header).get("index") != view.digest:
+                return  # Written against an older index.json, which has since been replaced
+            view.log_offset = len(header)
+        f.seek(view.log_offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1  # A line still being written waits for the next look
+    lines = data[:end].splitlines()
+    for line in lines:
+        view.apply(json.loads(line))
+    view.log_offset += end
+    view.log_lines += len(lines)
+
+
+def _write_index(entries):
+    """Replaces index.json with `entries`, which supersede everything in index.log."""
+    global _index_cache
+    os.makedirs(PETS_DIR, exist_ok=True)
+    with metrics.timer("store.serialize_index"):
+        text = json.dumps(entries, indent=2)
+    _atomic_write(INDEX_FILE, text)
+    _index_cache = _IndexView(_signature(INDEX_FILE), _digest(text), entries)
+    if os.path.exists(INDEX_LOG):
+        os.remove(INDEX_LOG)  # Its header names the old index.json, so readers already skip it
+
+
+def _log_index_entries(entries):
+    """
+    Records new or changed index entries by appending them to index.log, or
+    folds everything into a fresh index.json once the log has grown as long
+    as the index. Called under the lock, after _read_index().
+    """
+    view = _index_cache
+    for entry in entries:
+        view.apply(entry)
+    if view.sig is None or view.log_lines + len(entries) > max(INDEX_LOG_MIN, len(view.entries)):
+        _write_index(view.entries)
+        return
+    data = "".join(json.dumps(entry) + "\n" for entry in entries).encode("utf-8")
+    if not view.log_offset:  # Start a log for this index.json, replacing any older one
+        data = (json.dumps({"index": view.digest}) + "\n").encode("utf-8") + data
+    with metrics.timer("store.write_index_log"):
+        with open(INDEX_LOG, "r+b" if view.log_offset else "wb") as f:
+            f.seek(view.log_offset)
+            f.truncate()  # Drops a line left half-written by a crash
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+    view.log_offset += len(data)
+    view.log_lines += len(entries)
+
+
+def _write_pet(pet):
+    """Writes one pet's file, unless it already holds exactly this data."""
+    _reconcile(pet)
+    pet_summary(pet)
+    text = to_json(pet, indent=2)
+    digest = _digest(text)
+    if _on_disk.get(pet["id"]) == digest:
+        return False
+    os.makedirs(PETS_DIR, exist_ok=True)
+    _atomic_write(pet_path(pet["id"]), text)
+    _stamp(pet, digest, pet_signature(pet["id"]))
+    return True
+
+
+def _stamp(pet, digest, sig):
+    """Notes in `pet` that it matches the file with this digest and signature."""
+    _on_disk[pet["id"]] = digest
+    pet[_BASE] = (digest, sig, len(pet.get("history", [])), len(known_words(pet)))
+
+
+def _reconcile(pet):
+    """
+    Called under the lock before `pet` is written. If its file changed since
+    this dict was read or last saved, the history entries and words added to
+    it since then are re-applied to the newer copy (a release sticks too),
+    and `pet` is updated in place to the result, so the write keeps both sets
+    of changes. Each dict carries its own base, so reading the pet again
+    elsewhere in this process doesn't hide the change from an older dict.
+    """
+    base = pet.get(_BASE)
+    if base is None or pet_signature(pet["id"]) in (None, base[1]):
+        return
+    newer = read_pet(pet["id"])
+    if newer is None:
+        return  # Removed since
+    if newer[_BASE][0] == base[0]:
+        pet[_BASE] = newer[_BASE]  # Rewritten with the same contents
+        return
+    _, _, history_len, word_count = base
+    for entry in pet.get("history", [])[history_len:]:
+        record_event(newer, entry)
+    for word in list(known_words(pet))[word_count:]:
+        add_word(newer, word)
+    if pet.get("released"):
+        newer["released"] = True
+    pet.clear()
+    pet.update(newer)
+    metrics.count("store.merged_writes")
+
+
+def _ensure_id(pet):
+    if "id" not in pet:
+        pet["id"] = new_pet_id()
+    return pet["id"]
+
+
+def migrate_legacy_file():
+    """
+    Splits a legacy data/pets.json into per-pet files. Runs once: the old file
+    is kept as data/pets.json.migrated. Returns True if a migration happened.
+    """
+    if os.path.exists(INDEX_FILE) or not os.path.exists(PETS_FILE):
+        return False
+    with store_lock():
+        if os.path.exists(INDEX_FILE):  # Another program got here first
+            return False
+        with open(PETS_FILE, "r") as f:
+            pets = json.load(f)
+        pets = [{"id": new_pet_id(), **pet} if "id" not in pet else pet for pet in pets]
+        for pet in pets:
+            _write_pet(pet)
+        _write_index([_index_entry(pet) for pet in pets])
+        os.replace(PETS_FILE, PETS_FILE + ".migrated")
+    return True
+
+
+def pet_entries():
+    """The index: id, name and spawn date of every pet, in collection order."""
+    return list(_read_index())
+
+
+def pet_signature(pet_id):
+    """(mtime, size) of a pet's file, or None if it's gone. Changes whenever the pet does."""
+    try:
+        return _signature(pet_path(pet_id))
+    except FileNotFoundError:
+        return None
+
+
+def read_pet(pet_id):
+    """Reads one pet by id, or returns None if it no longer exists."""
+    try:
+        with open(pet_path(pet_id), "r") as f:
+            sig = _stat_signature(os.fstat(f.fileno()))  # Of the file actually read
+            text = f.read()
+    except FileNotFoundError:  # Removed since the index was read
+        return None
+    pet = _from_json(text)
+    _stamp(pet, _digest(text), sig)
+    _known_ids.add(pet_id)
+    return pet
 
 
+@metrics.timed("store.load")
+def read_pets():
+    """Returns every pet in collection order, without printing anything."""
+    pets = []
+    for entry in _read_index():
+        pet = read_pet(entry["id"])
+        if pet is not None:
+            pets.append(pet)
+    return pets
+
+
+def filter_pets(pets, active_only=False, name=None):
+    """Pets (or pet summaries) not released and/or whose name contains `name`, ignoring case."""
+    if active_only:
+        pets = [p for p in pets if not p.get("released")]
+    if name:
+        pets = [p for p in pets if name.lower() in p["name"].lower()]
+    return pets
+
+
+def load_pets():
+    pets = read_pets()
+    if not pets:
+        print(HIDING_MESSAGE)
+    return pets
+
+
+def add_pet(pet):
+    """Adds one new pet to the end of the collection, giving it an id if needed."""
+    with store_lock():
+        _ensure_id(pet)
+        _read_index()
+        _write_pet(pet)
+        _log_index_entries([_index_entry(pet)])
+        _known_ids.add(pet["id"])
+
+
+@metrics.timed("store.save")
 def save_pets(pets):
-    os.makedirs(DATA_DIR, exist_ok=True)
-    with open(PETS_FILE, "w") as f:
-        json.dump(pets, f, indent=2)
+    """
+    Saves the whole collection. Pets without an id are given one; only pets
+    whose data changed are written.
+
+    Pets that another program added since this one last looked are kept:
+    only pets this process knew about and that are missing from `pets` are
+    removed.
+    """
+    with store_lock():
+        old_entries = list(_read_index())
+        for pet in pets:
+            _ensure_id(pet)
+            _write_pet(pet)
+
+        saved = {pet["id"] for pet in pets}
+        removed = {pet_id for pet_id in _known_ids if pet_id not in saved}
+        entries = [_index_entry(pet) for pet in pets]
+        entries += [entry for entry in old_entries
+                    if entry["id"] not in saved and entry["id"] not in removed]
+        if entries != old_entries:
+            _write_index(entries)
+        _known_ids.update(saved)
+
+        for pet_id in removed:
+            if os.path.exists(pet_path(pet_id)):
+                os.remove(pet_path(pet_id))
+            _on_disk.pop(pet_id, None)
+            _known_ids.discard(pet_id)
 
 
+def find_pet_id(pet):
+    """Returns the stored id for `pet`, matching on name + spawn_date if it has none."""
+    if "id" in pet:
+        return pet["id"]
+    for entry in _read_index():
+        if entry["name"] == pet["name"] and entry["spawn_date"] == pet["spawn_date"]:
+            return entry["id"]
+    return None
+
+
+@metrics.timed("store.update")
 def update_pet(updated_pet):
     """
-    Updates a single pet in the saved list based on a unique identifier.
+    Updates a single pet in the saved collection, rewriting only its file.
     Returns True if updated, False if pet not found.
     """
-    pets = load_pets()
-    for i, pet in enumerate(pets):
-        # Use name + spawn_date as a unique identifier
-        if pet["name"] == updated_pet["name"] and pet["spawn_date"] == updated_pet["spawn_date"]:
-            pets[i] = updated_pet
-            save_pets(pets)
-            return True
-    return False
+    with store_lock():
+        entries = _read_index()
+        pet_id = find_pet_id(updated_pet)
+        i = _index_cache.positions.get(pet_id)
+        if i is None:
+            return False
+        updated_pet["id"] = pet_id
+        _write_pet(updated_pet)
+        entry = _index_entry(updated_pet)
+        if entry != entries[i]:
+            _log_index_entries([entry])
+        return True
+
+
+def _apply_staged(pets):
+    """Writes already-identified pets and refreshes their index entries.
+
+    Pets the index doesn't list yet are added to the end of it.
+    """
+    entries = _load_index()
+    positions = _index_cache.positions
+    changed = []
+    for pet in pets:
+        _write_pet(pet)
+        entry = _index_entry(pet)
+        i = positions.get(pet["id"])
+        if i is None or entry != entries[i]:
+            changed.append(entry)
+    if changed:
+        _log_index_entries(changed)
+
+
+def _replay_journal():
+    """
+    Finishes a transaction that was interrupted after it was journaled. The
+    journal is removed only once every pet and index entry in it is on disk,
+    so a crash at any point in between is finished by the next replay.
+    """
+    with store_lock():
+        if not os.path.exists(JOURNAL_FILE):
+            return
+        with open(JOURNAL_FILE, "r") as f:
+            pets = json.load(f)
+        for pet in pets:
+            _on_disk.pop(pet["id"], None)  # Always rewrite journaled pets
+        _apply_staged(pets)
+        os.remove(JOURNAL_FILE)
+        _fsync_directory(PETS_DIR)
+
+
+class Transaction:
+    """
+    Stages changes to several pets and saves them all at once, or not at all.
+
+    Changes are made on copies (see stage()), so if anything fails before the
+    commit, neither the files nor the caller's pet dicts are touched. On commit
+    the copies are written and then copied back into the original dicts.
+    Every history entry logged through the transaction shares one timestamp.
+    """
+
+    def __init__(self, refresh=None):
+        self.timestamp = datetime.now().isoformat()
+        self._refresh = refresh  # Called on a pet before the transaction first reads it
+        self._staged = {}  # id(original) -> (original, working copy), in staging order
+        self._new = set()  # Ids of pets added by this transaction
+        self.committed = []  # The original pets, once the commit has gone through
+
+    def stage(self, pet):
+        """Returns this transaction's working copy of `pet`."""
+        staged = self._staged.get(id(pet))
+        if staged is not None:
+            return staged[1]
+        if self._refresh:
+            self._refresh(pet)
+        copy = deepcopy(pet)
+        self._staged[id(pet)] = (pet, copy)
+        return copy
+
+    def current(self, pet):
+        """The pet as this transaction will save it: its working copy if staged."""
+        staged = self._staged.get(id(pet))
+        if staged is not None:
+            return staged[1]
+        if self._refresh:
+            self._refresh(pet)
+        return pet
+
+    def add(self, pet):
+        """Stages a new pet, which joins the end of the collection on commit."""
+        self._new.add(_ensure_id(pet))
+        return self.stage(pet)
+
+    def learn_word(self, pet, word):
+        """Adds `word` to the pet's vocabulary, moving a lone secret word into `words`."""
+        add_word(self.stage(pet), word)
+
+    def log_event(self, pet, **entry):
+        """Appends a history entry stamped with the transaction's timestamp."""
+        record_event(self.stage(pet), {"timestamp": self.timestamp, **entry})
+
+    @metrics.timed("store.commit")
+    def commit(self):
+        if not self._staged:
+            return
+        with store_lock():
+            staged = []
+            for original, copy in self._staged.values():
+                pet_id = copy["id"] if copy.get("id") in self._new else find_pet_id(copy)
+                if pet_id is None:
+                    raise ValueError(f"{copy['name']} isn't in the saved collection.")
+                copy["id"] = pet_id
+                _reconcile(copy)
+                staged.append(copy)
+
+            os.makedirs(PETS_DIR, exist_ok=True)
+            _atomic_write(JOURNAL_FILE, to_json(staged))
+            _replay_journal()
+            _known_ids.update(self._new)
+            for copy in staged:  # The journal wrote them from its own copies
+                _stamp(copy, _on_disk[copy["id"]], pet_signature(copy["id"]))
+
+        for original, copy in self._staged.values():
+            original.clear()
+            original.update(copy)
+        self.committed = [original for original, _ in self._staged.values()]
+        self._staged = {}
+
+
+@contextmanager
+def transaction():
+    """
+    with transaction() as tx: ... commits on a clean exit and discards every
+    staged change if the block raises.
+    """
+    tx = Transaction()
+    yield tx
+    tx.commit()
+
+
+def rebuild(pet_ids=None):
+    """
+    Recomputes the summary and letter histogram of the given pets (default:
+    all) from their raw history and words, and saves them.
+    """
+    with store_lock():
+        wanted = None if pet_ids is None else set(pet_ids)
+        pets = []
+        for entry in list(_read_index()):
+            if wanted is not None and entry["id"] not in wanted:
+                continue
+            pet = read_pet(entry["id"])
+            if pet is None:
+                continue
+            pet.pop("letter_counts", None)
+            letter_counts(pet)
+            pet["summary"] = build_summary(pet)
+            pets.append(pet)
+        _apply_staged(pets)
+    return len(pets)
+
+
+class PetRepository:
+    """
+    One session's view of the collection. The pets are loaded once and the
+    same dicts are handed out on every call, so callers can compare pets by
+    identity. Changes are written through to disk straight away. When another
+    program changes the store, the next call notices (the index moves) and
+    reloads just the pets whose files changed, updating the existing dicts
+    in place. Changes that rewrite only a pet's file (compaction, say) are
+    picked up when that pet is fetched with get() or read by a transaction;
+    update() merges with them in the store (see _reconcile()).
+    """
+
+    def __init__(self):
+        self._pets = {}  # id -> pet dict
+        self._order = []
+        self._file_sigs = {}  # id -> pet file signature the dict matches
+        self._index_sig = False  # Never loaded
+
+    def pets(self):
+        """Every pet, in collection order."""
+        self._refresh()
+        return [self._pets[pet_id] for pet_id in self._order]
+
+    def get(self, pet_id):
+        self._refresh()
+        if pet_id in self._pets:
+            self._reload(pet_id)
+        return self._pets.get(pet_id)
+
+    def _refresh(self):
+        entries = _read_index()
+        sig = (_index_cache.sig, _index_cache.log_offset)
+        if sig == self._index_sig:
+            return
+
+        order = [entry["id"] for entry in entries if self._reload(entry["id"])]
+
+        for pet_id in set(self._pets) - set(order):
+            del self._pets[pet_id]
+            self._file_sigs.pop(pet_id, None)
+        self._order = order
+        self._index_sig = sig
+
+    def _reload(self, pet_id):
+        """Brings the pet's dict up to date with its file, if that changed. False if it's gone."""
+        file_sig = pet_signature(pet_id)
+        if file_sig is None:
+            return False
+        if self._file_sigs.get(pet_id) != file_sig:
+            fresh = read_pet(pet_id)
+            if fresh is None:
+                return False
+            if pet_id in self._pets:
+                self._pets[pet_id].clear()
+                self._pets[pet_id].update(fresh)
+            else:
+                self._pets[pet_id] = fresh
+            self._file_sigs[pet_id] = fresh[_BASE][1]
+        return True
+
+    def _sync(self, pet):
+        """Reloads `pet` before a transaction reads it, if it's one of this session's dicts."""
+        if self._pets.get(pet.get("id")) is pet:
+            self._reload(pet["id"])
+
+    def _remember(self, pets):
+        """Notes that these dicts match their files, so they aren't reloaded."""
+        for pet in pets:
+            self._file_sigs[pet["id"]] = pet_signature(pet["id"])
+
+    def add(self, pet):
+        """Adds a new pet to the collection and saves it."""
+        self._refresh()
+        add_pet(pet)
+        self._pets[pet["id"]] = pet
+        self._order.append(pet["id"])
+        self._remember([pet])
+
+    def update(self, pet):
+        """Saves one pet. Returns False if it isn't in the collection."""
+        if not update_pet(pet):
+            return False
+        self._remember([pet])
+        return True
+
+    @contextmanager
+    def transaction(self):
+        """Like transaction(), for pets handed out by this repository.
+
+        Pets added with tx.add() join the repository once it commits. Each
+        pet is brought up to date with its file before the transaction first
+        reads it, so it works from what another program saved since.
+        """
+        tx = Transaction(refresh=self._sync)
+        yield tx
+        tx.commit()
+        for pet in tx.committed:
+            if pet["id"] not in self._pets:
+                self._pets[pet["id"]] = pet
+                self._order.append(pet["id"])
+        self._remember(tx.committed)
+
+
+_session = None
+
+
+def session():
+    """The process-wide PetRepository for interactive programs."""
+    global _session
+    if _session is None:
+        _session = PetRepository()
+    return _session
+
+
+def archive_path(pet_id, segment):
+    return os.path.join(ARCHIVE_DIR, pet_id, segment)
+
+
+def iter_history(pet, include_archive=True):
+    """Streams a pet's history, oldest first: archived segments, then the hot entries."""
+    if include_archive:
+        for segment in pet.get("archive", {}).get("segments", []):
+            path = archive_path(pet["id"], segment)
+            opener = gzip.open if segment.endswith(".gz") else open
+            with opener(path, "rt") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+    yield from pet.get("history", [])
+
+
+def _archive_old_history(pet, cutoff, compress):
+    """Moves history entries older than `cutoff` into a new segment. Returns how many moved."""
+    history = pet.get("history", [])
+    count = 0
+    while count < len(history) and datetime.fromisoformat(history[count]["timestamp"]) < cutoff:
+        count += 1
+    if not count:
+        return 0
+
+    archive = pet.setdefault("archive", {"entries": 0, "segments": []})
+    segment = f"{len(archive['segments']):05d}.jsonl" + (".gz" if compress else "")
+    path = archive_path(pet["id"], segment)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lines = "".join(json.dumps(entry) + "\n" for entry in history[:count])
+
+    # The segment is complete on disk before the pet's file stops holding
+    # those entries; a crash in between leaves an unreferenced segment, not a gap.
+    tmp_path = path + ".tmp"
+    with (gzip.open(tmp_path, "wt") if compress else open(tmp_path, "w")) as f:
+        f.write(lines)
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    pet_summary(pet)  # Make sure the totals include these entries before they leave
+    archive["segments"].append(segment)
+    archive["entries"] += count
+    archive["through"] = history[count - 1]["timestamp"]
+    pet["history"] = history[count:]
+    return count
+
+
+def compact(days=HISTORY_HORIZON_DAYS, compress=False):
+    """
+    Archives every pet's history older than `days` days. Returns the number
+    of entries moved.
+
+    Programs that loaded a pet before it was compacted still hold its old
+    history; when they save it, _reconcile() appends only their new entries
+    to the compacted file, so the archive isn't orphaned or duplicated.
+    """
+    cutoff = datetime.now() - timedelta(days=days)
+    moved = 0
+    for entry in pet_entries():
+        with store_lock():
+            pet = read_pet(entry["id"])
+            if pet is None:
+                continue
+            count = _archive_old_history(pet, cutoff, compress)
+            if count:
+                _write_pet(pet)
+                moved += count
+    return moved
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintenance for the pet store in data/pets/.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild", help="recompute every pet's summary from its history")
+    compact_cmd = commands.add_parser("compact", help="move old history into data/archive/")
+    compact_cmd.add_argument("--days", type=int, default=HISTORY_HORIZON_DAYS,
+                             help=f"keep this many days of history in each pet's file (default {HISTORY_HORIZON_DAYS})")
+    compact_cmd.add_argument("--gzip", action="store_true", help="compress the new archive segments")
+    args = parser.parse_args(argv)
+
+    if args.command == "rebuild":
+        print(f"Rebuilt summaries for {rebuild()} pet(s).")
+    elif args.command == "compact":
+        moved = compact(args.days, compress=args.gzip)
+        print(f"Archived {moved} history entr{'y' if moved == 1 else 'ies'}.")
+
+
+if __name__ == "__main__":
+    metrics.profiled(main)()
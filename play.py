@@ -1,13 +1,15 @@
 # play.py
 import random
 import time
-from datetime import datetime
-from voice import speak_word
-from pet_utils import load_pets, update_pet
+from voice import speak_chorus, speak_word
+from pet_utils import HIDING_MESSAGE, session
+from learning import pool_counts, draw_words
 
 def host_playdate():
     # Filter out released pets from being available for playdates.
-    all_pets = load_pets()
+    all_pets = session().pets()
+    if not all_pets:
+        print(HIDING_MESSAGE)
     active_pets = [p for p in all_pets if not p.get("released")]
     
     if len(active_pets) < 2:
@@ -16,10 +18,11 @@ def host_playdate():
 
     # Sequential selection of pets
     playdate_pets = []
+    chosen = set()  # ids of the pets already on the list
     while True:
         print("\nAvailable pets:")
         # Display only pets that are not already chosen for the current playdate
-        available_for_selection = [p for p in active_pets if p not in playdate_pets]
+        available_for_selection = [p for p in active_pets if p["id"] not in chosen]
         for i, pet in enumerate(available_for_selection, start=1):
             print(f"{i}. {pet['name']} ({pet['species']})")
 
@@ -28,8 +31,9 @@ def host_playdate():
             break
         if choice.isdigit() and 1 <= int(choice) <= len(available_for_selection):
             selected = available_for_selection[int(choice) - 1]
-            if selected not in playdate_pets:
+            if selected["id"] not in chosen:
                 playdate_pets.append(selected)
+                chosen.add(selected["id"])
                 print(f"Added {selected['name']} to the playdate!")
             else:
                 print("That pet is already on the list!") # This case should not be reachable now
@@ -60,46 +64,47 @@ def host_playdate():
         cmd = input("(Press Enter to continue, or type 'end' to finish): ").strip().lower()
         if cmd == "end":
             duration_seconds = int(time.time() - start_time)
-            conclude_playdate(playdate_pets, duration_seconds)
-            return
+            print("\nProcessing new friendships...")
+            spinner()
 
+            new_words = conclude_playdate(playdate_pets, duration_seconds)
+            for pet, new_word in new_words:
+                print(f"{pet['name']} learned a new word: {new_word}")
+            speak_chorus([new_word for _, new_word in new_words])  # Everyone tries theirs out at once
 
-def conclude_playdate(playdate_pets, duration_seconds):
-    print("\nProcessing new friendships...")
-    spinner()
+            print("\n✅ Playdate ended and logged successfully!\n")
+            return
 
-    # Gather all letters from all pets' words
-    all_letters = []
-    for pet in playdate_pets:
-        if "words" in pet:
-            for w in pet["words"]:
-                all_letters.extend(list(w))
-        elif "word" in pet:
-            all_letters.extend(list(pet["word"]))
 
-    for pet in playdate_pets:
-        new_word = "".join(random.choice(all_letters) for _ in range(5))
-        pet.setdefault("words", [])
-        if "word" in pet and pet["word"] not in pet["words"]:
-            pet["words"].append(pet["word"])
-            del pet["word"]
-        pet["words"].append(new_word)
+def conclude_playdate(playdate_pets, duration_seconds, tx=None):
+    """
+    Teaches every pet a new word drawn from the whole group's letters and logs
+    the playdate. Returns [(pet, new_word)].
 
-        print(f"{pet['name']} learned a new word: {new_word}")
-        speak_word(new_word)
+    The changes are staged in `tx` if given (and saved when it commits);
+    otherwise they are saved right away, together or not at all.
+    """
+    if tx is None:
+        with session().transaction() as tx:
+            return conclude_playdate(playdate_pets, duration_seconds, tx)
 
-        # Log playdate participation
-        pet.setdefault("history", []).append({
-            "timestamp": datetime.now().isoformat(),
-            "duration_seconds": duration_seconds,
-            "event": "playdate",
-            "partners": [p["name"] for p in playdate_pets if p is not pet]
-        })
+    # Gather all letters from all pets' words, then draw everyone's new word
+    pool = pool_counts([tx.current(pet) for pet in playdate_pets])
+    drawn = draw_words(list(pool), list(pool.values()), len(playdate_pets))
 
-        # Save each pet individually
-        update_pet(pet)
+    new_words = []
+    for pet, letters in zip(playdate_pets, drawn):
+        new_word = "".join(letters)
+        tx.learn_word(pet, new_word)
 
-    print("\n✅ Playdate ended and logged successfully!\n")
+        # Log playdate participation
+        tx.log_event(pet,
+            duration_seconds=duration_seconds,
+            event="playdate",
+            partners=[p["name"] for p in playdate_pets if p is not pet]
+        )
+        new_words.append((pet, new_word))
+    return new_words
 
 
 def spinner():
@@ -0,0 +1,112 @@
+# simulate.py
+"""Headless playdate simulator.
+
+Runs the learning rules from learning.py over a made-up population, with no
+audio, no prompts and nothing written to data/. Letters are stored as small
+integer codes (an index into learning.ALPHABET) in compact arrays, each pet
+keeps an 8-entry letter histogram next to its words, and each playdate draws
+all of its new words in one batch from the summed histograms. Independent
+runs are spread across processes, and every run is reproducible from its
+seed.
+
+    python simulate.py --pets 200 --playdates 10000 --runs 8 --seed 42
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from array import array
+from collections import Counter
+
+import metrics
+from learning import ALPHABET, WORD_LENGTH, draw_words
+
+CODES = range(len(ALPHABET))
+
+
+def new_population(size, rng):
+    """One secret word per pet, as a flat array of letter codes, plus its histogram."""
+    vocab = [array("B", rng.choices(CODES, k=WORD_LENGTH)) for _ in range(size)]
+    counts = []
+    for letters in vocab:
+        histogram = array("L", bytes(array("L").itemsize * len(CODES)))
+        for code in letters:
+            histogram[code] += 1
+        counts.append(histogram)
+    return vocab, counts
+
+
+def run_simulation(seed, pets=100, playdates=1000, min_group=2, max_group=5):
+    """Simulates one population and returns a summary of where it ended up."""
+    rng = random.Random(seed)
+    vocab, counts = new_population(pets, rng)
+    max_group = min(max_group, pets)
+
+    start = time.perf_counter()
+    for _ in range(playdates):
+        group = rng.sample(range(pets), rng.randint(min_group, max_group))
+
+        # Everyone hears everyone's letters, then everyone learns one word
+        pool = [sum(counts[pet][code] for pet in group) for code in CODES]
+        for pet, word in zip(group, draw_words(CODES, pool, len(group), rng)):
+            vocab[pet].extend(word)
+            for code in word:
+                counts[pet][code] += 1
+    elapsed = time.perf_counter() - start
+
+    return summarize(seed, vocab, playdates, elapsed)
+
+
+def summarize(seed, vocab, playdates, elapsed):
+    totals = Counter()
+    distinct = set()
+    for letters in vocab:
+        totals.update(letters)
+        codes = letters.tobytes()
+        distinct.update(codes[i:i + WORD_LENGTH] for i in range(0, len(codes), WORD_LENGTH))
+    all_letters = sum(totals.values())
+    sizes = [len(letters) // WORD_LENGTH for letters in vocab]
+    return {
+        "seed": seed,
+        "pets": len(vocab),
+        "playdates": playdates,
+        "seconds": round(elapsed, 4),
+        "letter_share": {ALPHABET[c]: round(totals[c] / all_letters, 6) for c in CODES},
+        "distinct_words": len(distinct),
+        "vocab_size": {"min": min(sizes), "mean": sum(sizes) / len(sizes), "max": max(sizes)},
+    }
+
+
+def run_many(runs, seed, jobs=None, **options):
+    """Runs independent simulations (seeds seed, seed+1, ...) in parallel."""
+    from concurrent.futures import ProcessPoolExecutor  # Only parallel runs pay for multiprocessing
+    seeds = [seed + i for i in range(runs)]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(run_simulation, s, **options) for s in seeds]
+        return [f.result() for f in futures]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate how vocabularies evolve over many playdates.")
+    parser.add_argument("--pets", type=int, default=100, help="population size (default 100)")
+    parser.add_argument("--playdates", type=int, default=1000, help="playdates per run (default 1000)")
+    parser.add_argument("--min-group", type=int, default=2, help="smallest playdate (default 2)")
+    parser.add_argument("--max-group", type=int, default=5, help="largest playdate (default 5)")
+    parser.add_argument("--runs", type=int, default=1, help="independent simulations (default 1)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first run (default 0)")
+    parser.add_argument("--jobs", type=int, help="worker processes (default: one per core)")
+    args = parser.parse_args(argv)
+
+    if not 2 <= args.min_group <= min(args.max_group, args.pets):
+        parser.error("need 2 <= --min-group <= --max-group, and at least --min-group pets")
+
+    results = run_many(args.runs, args.seed, jobs=args.jobs, pets=args.pets,
+                       playdates=args.playdates, min_group=args.min_group,
+                       max_group=args.max_group)
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    metrics.profiled(main)()
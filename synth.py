@@ -0,0 +1,268 @@
+# synth.py
+"""Tone synthesis shared by voice.py and voice_sampler.py.
+
+Every beep a pet makes is defined here, once. Notes and whole words are
+rendered as 16-bit signed little-endian mono PCM. NumPy is used when it is
+installed; otherwise the standard library `array` module does the work.
+NumPy is only imported when the first note is rendered, so importing this
+module (and voice.py, which imports it) stays cheap.
+
+tone() and render_word() are the raw sine bursts the samples have always
+been made of. render_note() and render_chorus() go through a small DSP
+stage instead: centred sines with attack/release envelopes, any number of
+words mixed into one buffer and scaled to stay under HEADROOM, all notes of
+all words synthesized in one batched pass. resample() converts PCM for
+devices that don't run at SAMPLE_RATE.
+"""
+import importlib.util
+import math
+import sys
+from array import array
+
+import metrics
+
+# NumPy is optional; the array fallback is pure Python.
+HAVE_NUMPY = importlib.util.find_spec("numpy") is not None
+np = None  # Set by _numpy() on first use
+
+SAMPLE_RATE = 44100  # Samples per second
+SAMPLE_WIDTH = 2     # Bytes per sample (16-bit audio)
+DEFAULT_FREQ = 440.0 # A4, used for characters outside the alphabet
+FULL_SCALE = 32767   # Largest 16-bit sample
+HEADROOM = 0.89      # Enveloped notes and mixes peak at most this much of the amplitude (about -1 dB)
+ATTACK = 0.005       # Seconds of fade-in at the start of each enveloped note
+RELEASE = 0.02       # Seconds of fade-out at its end
+
+# Map characters to frequencies (Hz)
+CHAR_TO_FREQ = {
+    "a": 261.63,  # C4
+    "s": 293.66,  # D4
+    "d": 329.63,  # E4
+    "f": 349.23,  # F4
+    "g": 392.00,  # G4
+    "h": 440.00,  # A4
+    "j": 493.88,  # B4
+    "k": 523.25,  # C5
+}
+
+
+def char_freq(char):
+    """Returns the frequency for a character, falling back to A4."""
+    return CHAR_TO_FREQ.get(char, DEFAULT_FREQ)
+
+
+def num_samples(duration, sample_rate=SAMPLE_RATE):
+    """Number of whole samples that fit in `duration` seconds."""
+    return int(duration * sample_rate)
+
+
+def silence(n):
+    """Returns `n` samples of silence."""
+    return bytes(n * SAMPLE_WIDTH)
+
+
+def _numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+    return np
+
+
+def _tone_numpy(frequency, n, amplitude, offset, sample_rate):
+    np = _numpy()
+    angle = 2 * np.pi * np.arange(n, dtype=np.float64) * frequency / sample_rate
+    samples = offset + amplitude * np.sin(angle)
+    return samples.astype("<i2").tobytes()
+
+
+def _tone_array(frequency, n, amplitude, offset, sample_rate):
+    sin = math.sin
+    step = 2 * math.pi
+    buf = array("h", [int(offset + amplitude * sin(step * i * frequency / sample_rate))
+                      for i in range(n)])
+    if sys.byteorder == "big":
+        buf.byteswap()
+    return buf.tobytes()
+
+
+def _word_numpy(freqs, n_note, n_gap, amplitude, offset, sample_rate):
+    np = _numpy()
+    # One row per character: the note followed by its trailing gap.
+    rows = np.zeros((len(freqs), n_note + n_gap), dtype="<i2")
+    angle = (2 * np.pi * np.arange(n_note, dtype=np.float64)[None, :]
+             * np.asarray(freqs, dtype=np.float64)[:, None] / sample_rate)
+    rows[:, :n_note] = offset + amplitude * np.sin(angle)
+    return rows.tobytes()
+
+
+def _word_array(freqs, n_note, n_gap, amplitude, offset, sample_rate):
+    gap = silence(n_gap)
+    return b"".join(_tone_array(f, n_note, amplitude, offset, sample_rate) + gap
+                    for f in freqs)
+
+
+_tone = _tone_numpy if HAVE_NUMPY else _tone_array
+_word = _word_numpy if HAVE_NUMPY else _word_array
+
+
+@metrics.timed("synth.tone")
+def tone(frequency, duration, amplitude, offset=0.0, sample_rate=SAMPLE_RATE):
+    """Renders a sine tone as raw PCM bytes.
+
+    Each sample is `offset + amplitude * sin(2*pi*f*t)`, truncated toward zero.
+    """
+    return _tone(frequency, num_samples(duration, sample_rate), amplitude, offset, sample_rate)
+
+
+@metrics.timed("synth.render_word")
+def render_word(word, note_duration, gap_duration, amplitude, offset=0.0,
+                sample_rate=SAMPLE_RATE):
+    """Renders a whole word (one note plus one gap per character) in one pass."""
+    freqs = [char_freq(c) for c in word.lower()]
+    if not freqs:
+        return b""
+    return _word(freqs, num_samples(note_duration, sample_rate),
+                 num_samples(gap_duration, sample_rate), amplitude, offset, sample_rate)
+
+
+def _envelope_lengths(n, attack, release, sample_rate):
+    attack_n = min(num_samples(attack, sample_rate), n)
+    release_n = min(num_samples(release, sample_rate), n - attack_n)
+    return attack_n, release_n
+
+
+def _mix_numpy(voices, starts, n_note, n_gap, attack_n, release_n, sample_rate):
+    np = _numpy()
+    row = n_note + n_gap
+    counts = np.array([len(freqs) for freqs in voices])
+    freqs = np.array([f for v in voices for f in v], dtype=np.float64)
+
+    envelope = np.ones(n_note)
+    envelope[:attack_n] = np.linspace(0.0, 1.0, attack_n, endpoint=False)
+    envelope[n_note - release_n:] = np.linspace(1.0, 0.0, release_n)
+
+    # Every distinct note is synthesized and enveloped once, as one block;
+    # each note of each voice is then a row of that block.
+    pitches, which = np.unique(freqs, return_inverse=True)
+    block = np.sin(2 * np.pi * pitches[:, None] * np.arange(n_note)[None, :] / sample_rate)
+    block *= envelope[None, :]
+    notes = block[which]
+
+    # Where each row lands in the mix: its voice's start plus its place in the word.
+    voice = np.repeat(np.arange(len(voices)), counts)
+    place = np.arange(len(freqs)) - np.repeat(np.cumsum(counts) - counts, counts)
+    first = np.asarray(starts)[voice] + place * row
+    total = max(start + len(freqs) * row for start, freqs in zip(starts, voices))
+    positions = first[:, None] + np.arange(n_note)[None, :]
+    return np.bincount(positions.ravel(), weights=notes.ravel(), minlength=total)
+
+
+def _mix_array(voices, starts, n_note, n_gap, attack_n, release_n, sample_rate):
+    row = n_note + n_gap
+    envelope = [1.0] * n_note
+    for i in range(attack_n):
+        envelope[i] = i / attack_n
+    for i in range(release_n):
+        envelope[n_note - release_n + i] = 1.0 - i / max(release_n - 1, 1)
+
+    total = max(start + len(freqs) * row for start, freqs in zip(starts, voices))
+    mix = [0.0] * total
+    sin = math.sin
+    for start, freqs in zip(starts, voices):
+        for place, frequency in enumerate(freqs):
+            step = 2 * math.pi * frequency / sample_rate
+            first = start + place * row
+            for i in range(n_note):
+                mix[first + i] += sin(step * i) * envelope[i]
+    return mix
+
+
+def _to_pcm_numpy(mix, amplitude):
+    np = _numpy()
+    peak = float(np.abs(mix).max()) if len(mix) else 0.0
+    gain = amplitude * HEADROOM / max(peak, 1.0)
+    return np.rint(mix * gain).astype("<i2").tobytes()
+
+
+def _to_pcm_array(mix, amplitude):
+    peak = max(map(abs, mix), default=0.0)
+    gain = amplitude * HEADROOM / max(peak, 1.0)
+    buf = array("h", [round(x * gain) for x in mix])
+    if sys.byteorder == "big":
+        buf.byteswap()
+    return buf.tobytes()
+
+
+def _resample_numpy(pcm, from_rate, to_rate):
+    np = _numpy()
+    source = np.frombuffer(pcm, dtype="<i2").astype(np.float64)
+    n_out = int(len(source) * to_rate / from_rate)
+    at = np.arange(n_out) * (from_rate / to_rate)
+    return np.rint(np.interp(at, np.arange(len(source)), source)).astype("<i2").tobytes()
+
+
+def _resample_array(pcm, from_rate, to_rate):
+    source = array("h", pcm)
+    if sys.byteorder == "big":
+        source.byteswap()
+    last = len(source) - 1
+    n_out = int(len(source) * to_rate / from_rate)
+    ratio = from_rate / to_rate
+    out = array("h", bytes(n_out * SAMPLE_WIDTH))
+    for i in range(n_out):
+        at = i * ratio
+        j = min(int(at), last)
+        frac = at - j
+        nxt = source[min(j + 1, last)]
+        out[i] = round(source[j] + (nxt - source[j]) * frac)
+    if sys.byteorder == "big":
+        out.byteswap()
+    return out.tobytes()
+
+
+_mix = _mix_numpy if HAVE_NUMPY else _mix_array
+_to_pcm = _to_pcm_numpy if HAVE_NUMPY else _to_pcm_array
+_resample = _resample_numpy if HAVE_NUMPY else _resample_array
+
+
+@metrics.timed("synth.render_chorus")
+def render_chorus(words, note_duration, gap_duration, amplitude=FULL_SCALE, stagger=0.0,
+                  attack=ATTACK, release=RELEASE, sample_rate=SAMPLE_RATE):
+    """Renders several words sung at once as one buffer of 16-bit PCM.
+
+    Word i starts `i * stagger` seconds in. Every note of every word is an
+    enveloped sine, synthesized together in one batch, and the mix is scaled
+    so its peak stays under HEADROOM * amplitude however many words overlap.
+    """
+    # Starts come from each word's place in `words`, so an empty word still
+    # holds its slot and the words after it keep their timing.
+    sung = [(num_samples(i * stagger, sample_rate), [char_freq(c) for c in word.lower()])
+            for i, word in enumerate(words)]
+    sung = [(start, freqs) for start, freqs in sung if freqs]
+    if not sung:
+        return b""
+    starts = [start for start, _ in sung]
+    voices = [freqs for _, freqs in sung]
+    n_note = num_samples(note_duration, sample_rate)
+    attack_n, release_n = _envelope_lengths(n_note, attack, release, sample_rate)
+    mix = _mix(voices, starts, n_note, num_samples(gap_duration, sample_rate),
+               attack_n, release_n, sample_rate)
+    return _to_pcm(mix, amplitude)
+
+
+def render_note(frequency, duration, amplitude=FULL_SCALE, attack=ATTACK, release=RELEASE,
+                sample_rate=SAMPLE_RATE):
+    """One enveloped, centred sine note, peaking at HEADROOM * amplitude."""
+    n = num_samples(duration, sample_rate)
+    if n == 0:
+        return b""
+    attack_n, release_n = _envelope_lengths(n, attack, release, sample_rate)
+    return _to_pcm(_mix([[frequency]], [0], n, 0, attack_n, release_n, sample_rate), amplitude)
+
+
+def resample(pcm, from_rate, to_rate):
+    """Converts 16-bit mono PCM between sample rates (linear interpolation)."""
+    if from_rate == to_rate or not pcm:
+        return pcm
+    return _resample(pcm, from_rate, to_rate)
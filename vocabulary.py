@@ -0,0 +1,123 @@
+# vocabulary.py
+"""A compact home for a pet's words.
+
+Words over learning.ALPHABET (eight letters, so three bits each) are packed
+into one 64-bit integer apiece: a leading 1 bit followed by the letter codes.
+Up to 20 letters fit. Anything else (other characters, very long words) is
+kept as a plain string on the side, so no word is ever lost.
+
+A Vocabulary behaves like the list of strings it replaces: it can be indexed,
+iterated, counted, appended to and passed to random.choice. Membership checks
+are O(1). On disk it is still a JSON list of strings (see pet_utils), so
+existing files and tools keep working.
+"""
+from array import array
+
+from learning import ALPHABET
+
+BITS = 3
+MAX_PACKED = 20  # 1 marker bit + 20 * 3 bits = 61 bits
+SIDE_FLAG = 1 << 63  # Marks a code that indexes the side list instead
+UNIQUE_WORDS = False  # Default policy: pets may learn the same word twice
+
+_CODE = {letter: i for i, letter in enumerate(ALPHABET)}
+
+
+def pack(word):
+    """The packed code for `word`, or None if it can't be packed."""
+    if len(word) > MAX_PACKED:
+        return None
+    code = 1
+    for letter in word:
+        c = _CODE.get(letter)
+        if c is None:
+            return None
+        code = (code << BITS) | c
+    return code
+
+
+def unpack(code):
+    letters = []
+    while code > 1:
+        letters.append(ALPHABET[code & 0b111])
+        code >>= BITS
+    return "".join(reversed(letters))
+
+
+class Vocabulary:
+    """A pet's words in learning order, optionally without repeats."""
+
+    def __init__(self, words=(), unique=None):
+        self.unique = UNIQUE_WORDS if unique is None else unique
+        self._codes = array("Q")
+        self._side = []
+        self._members = None  # Set of codes, built on the first membership check
+        for word in words:
+            self.append(word)
+
+    def _code(self, word):
+        code = pack(word)
+        if code is not None:
+            return code
+        try:
+            return SIDE_FLAG | self._side.index(word)
+        except ValueError:
+            return None
+
+    def _word(self, code):
+        if code & SIDE_FLAG:
+            return self._side[code & ~SIDE_FLAG]
+        return unpack(code)
+
+    def _member_codes(self):
+        if self._members is None:
+            self._members = set(self._codes)
+        return self._members
+
+    def append(self, word):
+        """Adds a word. Returns False if it was skipped as a repeat (unique vocabularies only)."""
+        if self.unique and word in self:
+            return False
+        code = pack(word)
+        if code is None:
+            code = SIDE_FLAG | len(self._side)
+            self._side.append(word)
+        self._codes.append(code)
+        if self._members is not None:
+            self._members.add(code)
+        return True
+
+    def extend(self, words):
+        for word in words:
+            self.append(word)
+
+    def to_list(self):
+        """The plain list of strings this vocabulary is saved as."""
+        return [self._word(code) for code in self._codes]
+
+    def __contains__(self, word):
+        if not isinstance(word, str):
+            return False
+        code = self._code(word)
+        return code is not None and code in self._member_codes()
+
+    def __len__(self):
+        return len(self._codes)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._word(code) for code in self._codes[i]]
+        return self._word(self._codes[i])
+
+    def __iter__(self):
+        return (self._word(code) for code in self._codes)
+
+    def __eq__(self, other):
+        if isinstance(other, (Vocabulary, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Vocabulary({self.to_list()!r})"
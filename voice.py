@@ -1,41 +1,182 @@
-import pygame
+import atexit
+import queue
+import threading
 import time
-import math
-
-# Map characters to frequencies (Hz) like before
-CHAR_TO_FREQ = {
-    "a": 261.63,  # C4
-    "s": 293.66,  # D4
-    "d": 329.63,  # E4
-    "f": 349.23,  # F4
-    "g": 392.00,  # G4
-    "h": 440.00,  # A4
-    "j": 493.88,  # B4
-    "k": 523.25,  # C5
-}
+from functools import lru_cache
 
+import audio
+import metrics
+import synth
+from synth import CHAR_TO_FREQ
+
+VOLUME = 32767
+TONE_BANK_SIZE = 64  # Rendered notes kept ready to play (least recently used go first)
+NOTE_DURATION = 0.2  # Seconds per beep
+NOTE_SPACING = 0.25  # Seconds from one beep's start to the next
+
+class Playback:
+    """A word queued by speak_word (or words, by speak_chorus). Wait on it, await it, or cancel it."""
+
+    def __init__(self, word, pcm=None):
+        self.word = word
+        self.pcm = pcm  # Pre-rendered audio to play instead of the word's notes
+        self.cancelled = False
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the word has finished playing. Returns False on timeout."""
+        return self._done.wait(timeout)
+
+    def cancel(self):
+        """Stop the word (or drop it, if it hasn't started yet)."""
+        self.cancelled = True
+        self._cancel.set()
+
+    def __await__(self):
+        import asyncio
+        return asyncio.get_running_loop().run_in_executor(None, self.wait).__await__()
+
+_queue = queue.Queue()
+_current = None  # The Playback being played right now
+_worker = None
+_worker_lock = threading.Lock()
+_clock = 0.0  # Session time for backends that don't play in real time
+_epoch = time.monotonic()
+
+@metrics.timed("voice.speak_word")
 def speak_word(word: str):
-    """Play the pet's word as short beeps using pygame."""
-    pygame.mixer.init(frequency=44100, size=-16, channels=1)
-    
-    for char in word.lower():
-        freq = CHAR_TO_FREQ.get(char, 440.0)  # fallback A4
-        beep = make_beep(freq, 0.2)  # 0.2 seconds per beep
-        beep.play()
-        time.sleep(0.25)  # small gap between notes
-    
-    pygame.mixer.quit()
-
-def make_beep(frequency, duration):
-    """Generate a beep sound as a pygame Sound object."""
-    sample_rate = 44100
-    n_samples = int(round(duration * sample_rate))
-    buf = bytearray()
-
-    volume = 32767
-    for s in range(n_samples):
-        t = float(s) / sample_rate
-        val = int(volume * 0.5 * (1 + math.sin(2.0 * math.pi * frequency * t)))
-        buf += val.to_bytes(2, byteorder="little", signed=True)
-
-    return pygame.mixer.Sound(buffer=bytes(buf))
+    """Queue the pet's word to be played as short beeps and return right away.
+
+    Words play one after another on a background thread. The returned
+    Playback lets the caller wait for (or cancel) this word.
+    """
+    init_audio()
+    _start_worker()
+    playback = Playback(word)
+    _queue.put(playback)
+    return playback
+
+@metrics.timed("voice.speak_chorus")
+def speak_chorus(words):
+    """Queue several words to be sung at once, mixed into one sound.
+
+    The whole chorus is rendered in one pass (see synth.render_chorus) and
+    plays as a single Playback, in turn with everything else queued.
+    """
+    init_audio()
+    _start_worker()
+    pcm = synth.render_chorus(words, NOTE_DURATION, NOTE_SPACING - NOTE_DURATION, VOLUME)
+    playback = Playback(" ".join(words), pcm)
+    _queue.put(playback)
+    return playback
+
+def wait_until_quiet(timeout=None):
+    """Block until every queued word has played."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while _queue.unfinished_tasks:
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def cancel_all():
+    """Stop the current word and drop everything still queued."""
+    while True:
+        try:
+            playback = _queue.get_nowait()
+        except queue.Empty:
+            break
+        playback.cancel()
+        playback._done.set()
+        _queue.task_done()
+    if _current is not None:
+        _current.cancel()
+
+def _start_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_play_forever, name="beeper-voice", daemon=True)
+            _worker.start()
+            atexit.register(wait_until_quiet, 30)  # Let the last words finish on exit
+
+def _play_forever():
+    global _current
+    while True:
+        playback = _queue.get()
+        _current = playback
+        try:
+            if not playback.cancelled:
+                _play(playback)
+        finally:
+            _current = None
+            playback._done.set()
+            _queue.task_done()
+
+@metrics.timed("voice.play_word")
+def _play(playback):
+    """Start each note at its offset from the first, instead of sleeping between them."""
+    global _clock
+    backend = audio.get_backend()
+    if playback.pcm is not None:
+        notes = [backend.make_sound(playback.pcm)]
+        length = len(playback.pcm) / (synth.SAMPLE_WIDTH * synth.SAMPLE_RATE)
+    else:
+        notes = [make_beep(synth.char_freq(char), NOTE_DURATION) for char in playback.word.lower()]
+        length = len(notes) * NOTE_SPACING
+
+    if not backend.realtime:
+        for i, beep in enumerate(notes):
+            backend.play(beep, _clock + i * NOTE_SPACING)
+        _clock += length
+        return
+
+    start = time.monotonic()
+    handles = []
+    for i, beep in enumerate(notes):
+        delay = start + i * NOTE_SPACING - time.monotonic()
+        if delay > 0 and playback._cancel.wait(delay):
+            break
+        handles.append(backend.play(beep, time.monotonic() - _epoch))
+
+    end = start + length
+    if playback.cancelled or playback._cancel.wait(max(end - time.monotonic(), 0)):
+        for handle in handles:
+            backend.stop(handle)
+
+_started = None  # The backend init_audio last started
+
+@metrics.timed("voice.init_audio")
+def init_audio():
+    """Start the audio backend once; it stays up for the rest of the session."""
+    global _started
+    backend = audio.get_backend()
+    if backend is not _started:
+        backend.start()
+        make_beep.cache_clear()  # Sounds belong to the backend that made them
+        _started = backend
+
+def close_audio():
+    """Stop playback, shut the backend down and forget every rendered note."""
+    global _started
+    cancel_all()
+    wait_until_quiet()
+    make_beep.cache_clear()
+    audio.get_backend().close()
+    _started = None
+
+@lru_cache(maxsize=TONE_BANK_SIZE)
+@metrics.timed("voice.make_beep")  # Inside the cache, so only renders are timed
+def make_beep(frequency, duration, volume=VOLUME):
+    """Generate a beep sound for the current audio backend.
+
+    Notes are kept in a process-wide tone bank, so each (frequency, duration,
+    volume) is only rendered once. Each is a centred sine with a short fade
+    in and out, kept under synth.HEADROOM so it never clips or clicks.
+    """
+    pcm = synth.render_note(frequency, duration, volume)
+    return audio.get_backend().make_sound(pcm)
@@ -1,34 +1,38 @@
 # voice_sampler.py
+import argparse
+import contextlib
+import hashlib
 import json
 import os
-import math
+import sys
+import time
 import wave
 from datetime import datetime
 
+import metrics
+import pet_utils
+import synth
+import word_cache
+
 # --- Configuration ---
-DATA_FILE = "data/pets.json"
 OUTPUT_DIR = "audio_samples"
+EXPORT_INDEX = os.path.join(OUTPUT_DIR, ".export_index.json")  # Hashes of exported vocabularies
 
 # Audio settings
-SAMPLE_RATE = 44100  # Samples per second
+SAMPLE_RATE = synth.SAMPLE_RATE  # Samples per second
 AMPLITUDE = 16000    # Volume (max is 32767 for 16-bit audio)
 NOTE_DURATION = 0.18 # Seconds per character beep
 GAP_DURATION = 0.07  # Seconds of silence between beeps
 WORD_PAUSE = 0.5     # Seconds of silence between words
+CHORUS_STAGGER = 0.04  # Seconds between voices joining a chorus
 
-# Character to frequency mapping (from voice.py)
-CHAR_TO_FREQ = {
-    "a": 261.63, "s": 293.66, "d": 329.63, "f": 349.23,
-    "g": 392.00, "h": 440.00, "j": 493.88, "k": 523.25,
-}
+# Character to frequency mapping (shared with voice.py)
+CHAR_TO_FREQ = synth.CHAR_TO_FREQ
 
 # --- Helper Functions ---
 def load_pets():
-    """Loads all pets from the JSON file."""
-    if not os.path.exists(DATA_FILE):
-        return []
-    with open(DATA_FILE, "r") as f:
-        return json.load(f)
+    """Loads all pets from the pet store."""
+    return pet_utils.read_pets()
 
 def select_pet(pets):
     """Prompts the user to select a pet from a list."""
@@ -45,32 +49,65 @@ def select_pet(pets):
 
 def generate_wave_data(frequency, duration):
     """Generates raw byte data for a sine wave."""
-    num_samples = int(duration * SAMPLE_RATE)
-    data = bytearray()
-    for i in range(num_samples):
-        angle = 2 * math.pi * i * frequency / SAMPLE_RATE
-        sample = int(AMPLITUDE * math.sin(angle))
-        # Convert to 16-bit signed little-endian bytes
-        data += sample.to_bytes(2, byteorder='little', signed=True)
-    return data
-
-def save_wav_file(pet_name, audio_data):
-    """Saves the combined audio data to a .wav file."""
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    filename = f"{pet_name.replace(' ', '_')}_vocab_{datetime.now().strftime('%Y%m%d')}.wav"
-    filepath = os.path.join(OUTPUT_DIR, filename)
-    
-    with wave.open(filepath, 'wb') as wav_file:
+    return synth.tone(frequency, duration, AMPLITUDE, sample_rate=SAMPLE_RATE)
+
+def generate_word_data(word):
+    """Generates raw byte data for one word: a beep and a gap per character.
+
+    Words are cached (in memory and under data/audio_cache/), so a word that
+    has been sampled before is read back instead of synthesized again.
+    """
+    return word_cache.default_cache().get(word, NOTE_DURATION, GAP_DURATION, AMPLITUDE,
+                                          sample_rate=SAMPLE_RATE)
+
+def vocab_frame_count(words):
+    """Number of audio frames the vocabulary will take, without rendering it."""
+    per_char = synth.num_samples(NOTE_DURATION, SAMPLE_RATE) + synth.num_samples(GAP_DURATION, SAMPLE_RATE)
+    pauses = synth.num_samples(WORD_PAUSE, SAMPLE_RATE) * max(len(words) - 1, 0)
+    return per_char * sum(len(word) for word in words) + pauses
+
+def iter_vocab_audio(words):
+    """Yields the vocabulary's audio one word (or pause) at a time."""
+    word_pause_audio = generate_wave_data(0, WORD_PAUSE)
+
+    for i, word in enumerate(words):
+        yield generate_word_data(word)
+
+        # Add a longer pause between words, but not after the last one
+        if i < len(words) - 1:
+            yield word_pause_audio
+
+@metrics.timed("sampler.write_wav")
+def write_wav(target, words):
+    """Streams the vocabulary into a .wav file path or a writable binary file.
+
+    The frame count is known up front, so the header is written once and the
+    target never needs to seek; that is what lets this write to a pipe.
+    """
+    with wave.open(target, 'wb') as wav_file:
         wav_file.setnchannels(1)  # Mono audio
         wav_file.setsampwidth(2)  # 16-bit audio (2 bytes per sample)
         wav_file.setframerate(SAMPLE_RATE)
-        wav_file.writeframes(audio_data)
-        
+        wav_file.setnframes(vocab_frame_count(words))
+        for chunk in iter_vocab_audio(words):
+            wav_file.writeframesraw(chunk)
+
+def sample_path(pet_name, pet_id=None):
+    """Dated .wav path in OUTPUT_DIR for a pet; with `pet_id`, unique to that pet."""
+    stem = pet_name.replace(' ', '_') + (f"_{pet_id}" if pet_id else "")
+    filename = f"{stem}_vocab_{datetime.now().strftime('%Y%m%d')}.wav"
+    return os.path.join(OUTPUT_DIR, filename)
+
+def save_wav_file(pet_name, words):
+    """Saves the pet's vocabulary to a dated .wav file in OUTPUT_DIR."""
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    filepath = sample_path(pet_name)
+    write_wav(filepath, words)
     print(f"\n✅ Success! Audio sample saved to: {filepath}")
 
 # --- Main Execution ---
-def main():
-    """Main function to run the voice sampler."""
+def sample_pet(output=None):
+    """Asks for a pet and writes its voice sample to `output` (or OUTPUT_DIR)."""
     pets = load_pets()
     if not pets:
         print("No pets found. Create a pet in the main app first!")
@@ -83,27 +120,159 @@ def main():
     print(f"\nGenerating voice sample for {selected_pet['name']}...")
 
     words_to_speak = selected_pet.get("words", [selected_pet.get("word", "")])
-    full_audio = bytearray()
-    
-    # Generate silence data for pauses
-    gap_audio = generate_wave_data(0, GAP_DURATION)
-    word_pause_audio = generate_wave_data(0, WORD_PAUSE)
+    if not vocab_frame_count(words_to_speak):
+        print("This pet doesn't know any words to sample!")
+        return
 
-    for i, word in enumerate(words_to_speak):
-        for char in word.lower():
-            freq = CHAR_TO_FREQ.get(char, 440.0) # Default to 440 Hz
-            full_audio.extend(generate_wave_data(freq, NOTE_DURATION))
-            full_audio.extend(gap_audio)
-        
-        # Add a longer pause between words, but not after the last one
-        if i < len(words_to_speak) - 1:
-            full_audio.extend(word_pause_audio)
+    if output is None:
+        save_wav_file(selected_pet['name'], words_to_speak)
+    else:
+        write_wav(output, words_to_speak)
+        print("\n✅ Success! Audio sample written.")
 
-    if not full_audio:
-        print("This pet doesn't know any words to sample!")
+# --- Chorus ---
+def write_chorus(target, words, sample_rate=SAMPLE_RATE):
+    """Writes the words sung all at once (see synth.render_chorus) as one .wav."""
+    pcm = synth.render_chorus(words, NOTE_DURATION, GAP_DURATION, AMPLITUDE,
+                              stagger=CHORUS_STAGGER, sample_rate=sample_rate)
+    with wave.open(target, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(synth.SAMPLE_WIDTH)
+        wav_file.setframerate(sample_rate)
+        wav_file.setnframes(len(pcm) // synth.SAMPLE_WIDTH)  # No seeking back, so pipes work
+        wav_file.writeframes(pcm)
+
+def export_chorus(pets, output=None, sample_rate=SAMPLE_RATE):
+    """Every pet sings its newest word at once, into `output` (or a dated file in OUTPUT_DIR)."""
+    words = [pet_words(pet)[-1] for pet in pets if pet_words(pet) and pet_words(pet)[-1]]
+    if not words:
+        print("None of these pets know any words yet!")
         return
+    if output is None:
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        output = os.path.join(OUTPUT_DIR, f"chorus_{datetime.now().strftime('%Y%m%d')}.wav")
+    start = time.perf_counter()
+    write_chorus(output, words, sample_rate)
+    where = output if isinstance(output, str) else "output"
+    print(f"\n✅ A chorus of {len(words)} pet(s) written to {where} in {time.perf_counter() - start:.2f}s.")
+
+# --- Batch Export ---
+def pet_words(pet):
+    return pet.get("words", [pet.get("word", "")])
+
+def vocab_hash(words):
+    """Fingerprint of a vocabulary plus every setting that shapes its audio."""
+    settings = [SAMPLE_RATE, AMPLITUDE, NOTE_DURATION, GAP_DURATION, WORD_PAUSE]
+    payload = json.dumps([settings, list(words)])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def load_export_index():
+    if not os.path.exists(EXPORT_INDEX):
+        return {}
+    with open(EXPORT_INDEX, "r") as f:
+        return json.load(f)
+
+def save_export_index(index):
+    with open(EXPORT_INDEX, "w") as f:
+        json.dump(index, f, indent=2)
+
+def _init_export_worker():
+    # Workers read the shared word cache but never append to it, so several
+    # processes can't interleave writes to the same blob.
+    word_cache.use_cache(word_cache.WordCache(persist=False))
+
+def _export_one(filepath, words):
+    start = time.perf_counter()
+    write_wav(filepath, words)
+    return time.perf_counter() - start
+
+@metrics.timed("sampler.export_all")
+def export_all(pets, jobs=None, force=False):
+    """Writes a .wav for every pet in `pets`, spread across a process pool.
+
+    Pets whose vocabulary (and audio settings) hash the same as at their last
+    export are skipped, as long as that file is still there.
+    """
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    index = load_export_index()
+    pending = {}
+    for pet in pets:
+        words = pet_words(pet)
+        key = pet.get("id") or f"{pet['name']}|{pet['spawn_date']}"
+        digest = vocab_hash(words)
+        previous = index.get(key, {})
+        if not force and previous.get("hash") == digest and os.path.exists(previous.get("file", "")):
+            print(f"  {pet['name']}: unchanged, skipped")
+            continue
+        if not vocab_frame_count(words):
+            print(f"  {pet['name']}: doesn't know any words yet, skipped")
+            continue
+        pending[key] = (pet, digest, sample_path(pet["name"], pet.get("id")), words)
+
+    if not pending:
+        print("\nNothing new to export.")
+        return
+
+    from concurrent.futures import ProcessPoolExecutor  # Only batch exports pay for multiprocessing
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_export_worker) as pool:
+        futures = {key: pool.submit(_export_one, filepath, words)
+                   for key, (_, _, filepath, words) in pending.items()}
+        for key, future in futures.items():
+            pet, digest, filepath, _ = pending[key]
+            elapsed = future.result()
+            index[key] = {"hash": digest, "file": filepath}
+            print(f"  {pet['name']}: {elapsed:.2f}s -> {filepath}")
+
+    save_export_index(index)
+    print(f"\n✅ Exported {len(pending)} sample(s) in {time.perf_counter() - start:.2f}s.")
+
+def main(argv=None):
+    """Main function to run the voice sampler."""
+    parser = argparse.ArgumentParser(description="Save a pet's vocabulary as a .wav file.")
+    parser.add_argument("-o", "--output",
+                        help="file to write instead of audio_samples/; use '-' for stdout")
+    batch = parser.add_argument_group("batch export (no prompts)")
+    batch.add_argument("--all", action="store_true", help="export every pet")
+    batch.add_argument("--active", action="store_true", help="export pets that haven't been released")
+    batch.add_argument("--name", help="export pets whose name contains this text")
+    batch.add_argument("--jobs", type=int, help="worker processes (default: one per core)")
+    batch.add_argument("--force", action="store_true", help="export even if nothing changed")
+    chorus = parser.add_argument_group("chorus")
+    chorus.add_argument("--chorus", action="store_true",
+                        help="mix every selected pet's newest word into one .wav "
+                             "(default selection: active pets; -o sets the file)")
+    chorus.add_argument("--rate", type=int, default=SAMPLE_RATE,
+                        help=f"chorus sample rate in Hz (default {SAMPLE_RATE})")
+    args = parser.parse_args(argv)
 
-    save_wav_file(selected_pet['name'], full_audio)
+    if args.chorus:
+        pets = pet_utils.filter_pets(load_pets(), active_only=not args.all, name=args.name)
+        if not pets:
+            print("No matching pets found.")
+            return
+        if args.output == "-":
+            wav_out = sys.stdout.buffer
+            with contextlib.redirect_stdout(sys.stderr):
+                export_chorus(pets, wav_out, args.rate)
+            wav_out.flush()
+        else:
+            export_chorus(pets, args.output, args.rate)
+    elif args.all or args.active or args.name:
+        pets = pet_utils.filter_pets(load_pets(), active_only=args.active, name=args.name)
+        if not pets:
+            print("No matching pets found.")
+            return
+        print(f"Exporting voice samples for {len(pets)} pet(s)...")
+        export_all(pets, jobs=args.jobs, force=args.force)
+    elif args.output == "-":
+        # The WAV goes to stdout, so menus and messages move to stderr.
+        wav_out = sys.stdout.buffer
+        with contextlib.redirect_stdout(sys.stderr):
+            sample_pet(wav_out)
+        wav_out.flush()
+    else:
+        sample_pet(args.output)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    metrics.profiled(main)()
\ No newline at end of file
@@ -0,0 +1,164 @@
+# word_cache.py
+"""Rendered words, cached in memory and on disk.
+
+A word is rendered once per set of synthesis parameters and then kept:
+recently used words stay in memory, and every word is appended to one raw
+PCM blob under data/audio_cache/ with a small JSON index of offsets. The blob
+is memory-mapped, so replaying or exporting a known word just reads bytes.
+
+The cache key includes the sample rate, note and gap durations, amplitude and
+offset, so changing any of them simply misses and renders fresh audio.
+
+Several programs can share the cache: appends and index updates happen under
+an advisory lock on data/audio_cache/.lock, each word's offset is the blob's
+size at the moment it is appended, and flush() merges into the index on disk
+rather than replacing it.
+"""
+import atexit
+import json
+import mmap
+import os
+from collections import OrderedDict
+
+import file_lock
+import metrics
+import synth
+
+CACHE_DIR = os.path.join("data", "audio_cache")
+BLOB_NAME = "words.pcm"
+INDEX_NAME = "index.json"
+LOCK_NAME = ".lock"
+MEMORY_SIZE = 32  # Words kept in memory (least recently used go first)
+
+
+def cache_key(word, note_duration, gap_duration, amplitude, offset=0.0,
+              sample_rate=synth.SAMPLE_RATE):
+    """Identifies one rendering of a word."""
+    return f"{word.lower()}|{sample_rate}|{note_duration!r}|{gap_duration!r}|{amplitude!r}|{offset!r}"
+
+
+class WordCache:
+    """Renders words through synth.render_word and remembers the result."""
+
+    def __init__(self, directory=CACHE_DIR, memory_size=MEMORY_SIZE, persist=True):
+        self.directory = directory
+        self.memory_size = memory_size
+        self.persist = persist
+        self._memory = OrderedDict()
+        self._index = None  # key -> [offset, length], loaded on first use
+        self._map = None
+        self._dirty = False
+
+    @property
+    def blob_path(self):
+        return os.path.join(self.directory, BLOB_NAME)
+
+    @property
+    def index_path(self):
+        return os.path.join(self.directory, INDEX_NAME)
+
+    def _locked(self):
+        """Holds the cache's advisory lock, shared with other processes."""
+        return file_lock.locked(os.path.join(self.directory, LOCK_NAME))
+
+    def get(self, word, note_duration, gap_duration, amplitude, offset=0.0,
+            sample_rate=synth.SAMPLE_RATE):
+        """Returns the PCM bytes for `word`, rendering it only if never seen."""
+        key = cache_key(word, note_duration, gap_duration, amplitude, offset, sample_rate)
+        pcm = self._memory.get(key)
+        if pcm is not None:
+            self._memory.move_to_end(key)
+            metrics.count("word_cache.memory_hits")
+            return pcm
+
+        pcm = self._read(key)
+        if pcm is None:
+            metrics.count("word_cache.renders")
+            pcm = synth.render_word(word, note_duration, gap_duration, amplitude,
+                                    offset, sample_rate)
+            self._write(key, pcm)
+        self._remember(key, pcm)
+        return pcm
+
+    def flush(self):
+        """Merges the words added here into the offset index on disk."""
+        if not self._dirty:
+            return
+        with self._locked():
+            merged = self._read_index_file()
+            merged.update(self._index)
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(merged, f)
+            os.replace(tmp_path, self.index_path)
+        self._index = merged
+        self._dirty = False
+
+    def close(self):
+        self.flush()
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def _remember(self, key, pcm):
+        self._memory[key] = pcm
+        if len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _load_index(self):
+        if self._index is None:
+            self._index = self._read_index_file()
+
+    def _read_index_file(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path, "r") as f:
+            return json.load(f)
+
+    def _read(self, key):
+        self._load_index()
+        entry = self._index.get(key)
+        if entry is None:
+            return None
+        start, length = entry
+        if self._map is None or start + length > len(self._map):
+            self._remap()
+        if self._map is None or start + length > len(self._map):
+            return None  # The blob is shorter than the index says; render again.
+        return self._map[start:start + length]
+
+    def _remap(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if not os.path.exists(self.blob_path) or os.path.getsize(self.blob_path) == 0:
+            return
+        with open(self.blob_path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _write(self, key, pcm):
+        if not self.persist or not pcm:
+            return
+        with self._locked(), open(self.blob_path, "ab") as f:
+            start = os.fstat(f.fileno()).st_size  # The end of the blob, whoever appended last
+            f.write(pcm)
+        self._index[key] = [start, len(pcm)]
+        self._dirty = True
+
+
+_default = None
+
+
+def default_cache():
+    """The process-wide cache, flushed automatically at exit."""
+    global _default
+    if _default is None:
+        _default = WordCache()
+        atexit.register(_default.close)
+    return _default
+
+
+def use_cache(cache):
+    """Replaces the process-wide cache, e.g. with a read-only one in a worker."""
+    global _default
+    _default = cache